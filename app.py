@@ -1,10 +1,10 @@
 """Flask web application for book download service with URL rewrite support."""
 
 import logging
-import io, re, os
+import io, re, os, json
 import sqlite3
 from functools import wraps
-from flask import Flask, request, jsonify, render_template, send_file, send_from_directory
+from flask import Flask, request, jsonify, render_template, send_file, send_from_directory, stream_with_context
 from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import check_password_hash
 from werkzeug.wrappers import Response
@@ -175,6 +175,18 @@ if DEBUG:
         """
         os._exit(0)
 
+def _search_filters_from_request() -> SearchFilters:
+    """Build search filters from the request query parameters."""
+    return SearchFilters(
+        isbn = request.args.getlist('isbn'),
+        author = request.args.getlist('author'),
+        title = request.args.getlist('title'),
+        lang = request.args.getlist('lang'),
+        sort = request.args.get('sort'),
+        content = request.args.getlist('content'),
+        format = request.args.getlist('format'),
+    )
+
 @app.route('/api/search', methods=['GET'])
 @login_required
 def api_search() -> Union[Response, Tuple[Response, int]]:
@@ -190,32 +202,68 @@ def api_search() -> Union[Response, Tuple[Response, int]]:
         sort (str): Order to sort results
         content (str): Content type of book
         format (str): File format filter (pdf, epub, mobi, azw3, fb2, djvu, cbz, cbr)
+        page (int): First results page to fetch (default 1)
+        max_pages (int): Number of pages to fetch concurrently (default 1)
 
     Returns:
         flask.Response: JSON array of matching books or error response.
+        The X-Next-Page header holds the page to request next, if any.
     """
     query = request.args.get('query', '')
+    try:
+        page = int(request.args.get('page', 1))
+        max_pages = int(request.args.get('max_pages', 1))
+    except ValueError:
+        return jsonify({"error": "Invalid page value"}), 400
 
-    filters = SearchFilters(
-        isbn = request.args.getlist('isbn'),
-        author = request.args.getlist('author'),
-        title = request.args.getlist('title'),
-        lang = request.args.getlist('lang'),
-        sort = request.args.get('sort'),
-        content = request.args.getlist('content'),
-        format = request.args.getlist('format'),
-    )
+    filters = _search_filters_from_request()
 
     if not query and not any(vars(filters).values()):
         return jsonify([])
 
     try:
-        books = backend.search_books(query, filters)
-        return jsonify(books)
+        books, next_page = backend.search_books(query, filters, page, max_pages)
+        response = jsonify(books)
+        if next_page is not None:
+            response.headers['X-Next-Page'] = str(next_page)
+        return response
     except Exception as e:
         logger.error_trace(f"Search error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/search/stream', methods=['GET'])
+@login_required
+def api_search_stream() -> Union[Response, Tuple[Response, int]]:
+    """
+    Search for books, streaming each result as soon as it is parsed.
+
+    Accepts the same query parameters as /api/search, except max_pages.
+
+    Returns:
+        flask.Response: Newline-delimited JSON (one book object per line), in page order.
+    """
+    query = request.args.get('query', '')
+    try:
+        page = int(request.args.get('page', 1))
+    except ValueError:
+        return jsonify({"error": "Invalid page value"}), 400
+
+    filters = _search_filters_from_request()
+
+    if not query and not any(vars(filters).values()):
+        return Response("", mimetype='application/x-ndjson')
+
+    def generate() -> typing.Iterator[str]:
+        for book in backend.stream_search_books(query, filters, page):
+            yield json.dumps(book) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        # Ask reverse proxies not to buffer the stream
+        headers={'X-Accel-Buffering': 'no', 'Cache-Control': 'no-cache'},
+    )
+
 @app.route('/api/info', methods=['GET'])
 @login_required
 def api_info() -> Union[Response, Tuple[Response, int]]:
@@ -440,6 +488,37 @@ def api_active_downloads() -> Union[Response, Tuple[Response, int]]:
         logger.error_trace(f"Active downloads error: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/network/stats', methods=['GET'])
+@login_required
+def api_network_stats() -> Union[Response, Tuple[Response, int]]:
+    """
+    Get HTTP connection reuse counters and the number of stalled transfers.
+
+    Returns:
+        flask.Response: JSON with request, new connection, reused connection and stalled transfer counts.
+    """
+    try:
+        return jsonify(backend.get_network_stats())
+    except Exception as e:
+        logger.error_trace(f"Network stats error: {e}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/sources/stats', methods=['GET'])
+@login_required
+def api_source_stats() -> Union[Response, Tuple[Response, int]]:
+    """
+    Get the download statistics used to order download sources.
+
+    Returns:
+        flask.Response: JSON array with the attempts, success rate, link resolution time,
+        time to first byte and speed of each source class and host.
+    """
+    try:
+        return jsonify(backend.get_source_stats())
+    except Exception as e:
+        logger.error_trace(f"Source stats error: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/queue/clear', methods=['DELETE'])
 @login_required
 def api_clear_completed() -> Union[Response, Tuple[Response, int]]:
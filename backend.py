@@ -1,9 +1,9 @@
 """Backend logic for the book download application."""
 
-import threading, time
+import threading
 import shutil
 from pathlib import Path
-from typing import Dict, List, Optional, Any, Tuple
+from typing import Dict, List, Optional, Any, Tuple, Iterator
 import subprocess
 import os
 from concurrent.futures import ThreadPoolExecutor, Future
@@ -11,33 +11,66 @@ from threading import Event
 
 from logger import setup_logger
 from config import CUSTOM_SCRIPT, CUSTOM_SCRIPT_AFTER_MOVING
-from env import INGEST_DIR, TMP_DIR, MAIN_LOOP_SLEEP_TIME, USE_BOOK_TITLE, MAX_CONCURRENT_DOWNLOADS, DOWNLOAD_PROGRESS_UPDATE_INTERVAL
+from env import INGEST_DIR, TMP_DIR, USE_BOOK_TITLE, MAX_CONCURRENT_DOWNLOADS, DOWNLOAD_PROGRESS_UPDATE_INTERVAL, METADATA_RESOLVER_WORKERS
+from env import PARK_COUNTDOWNS
 from models import book_queue, BookInfo, QueueStatus, SearchFilters
 import book_manager
+import downloader
+import network
+from timer_wheel import TimerWheel
 
 logger = setup_logger(__name__)
 
+# Fetches the details of newly queued books, outside of the HTTP request
+_resolver_executor = ThreadPoolExecutor(max_workers=METADATA_RESOLVER_WORKERS, thread_name_prefix="BookResolver")
+# Puts books waiting for a partner server countdown back in the queue when it ends
+_countdown_timers = TimerWheel(tick=1.0, slots=512, name="CountdownTimers")
+
 def _sanitize_filename(filename: str) -> str:
     """Sanitize a filename by replacing spaces with underscores and removing invalid characters."""
     keepcharacters = (' ','.','_')
     return "".join(c for c in filename if c.isalnum() or c in keepcharacters).rstrip()
 
-def search_books(query: str, filters: SearchFilters) -> List[Dict[str, Any]]:
+def search_books(query: str, filters: SearchFilters, page: int = 1, max_pages: int = 1) -> Tuple[List[Dict[str, Any]], Optional[int]]:
     """Search for books matching the query.
     
     Args:
         query: Search term
         filters: Search filters object
+        page: First results page to fetch
+        max_pages: Number of pages to fetch
         
     Returns:
-        List[Dict]: List of book information dictionaries
+        Tuple[List[Dict], Optional[int]]: List of book information dictionaries, and the next page to request
     """
     try:
-        books = book_manager.search_books(query, filters)
-        return [_book_info_to_dict(book) for book in books]
+        books, next_page = book_manager.search_books(query, filters, page, max_pages)
+        return [_book_info_to_dict(book) for book in books], next_page
+    except book_manager.NoResultsError:
+        logger.info(f"No books found for query: '{query}'")
+        return [], None
     except Exception as e:
         logger.error_trace(f"Error searching books: {e}")
-        return []
+        return [], None
+
+def stream_search_books(query: str, filters: SearchFilters, page: int = 1) -> Iterator[Dict[str, Any]]:
+    """Search for books matching the query, yielding results as they are parsed.
+    
+    Args:
+        query: Search term
+        filters: Search filters object
+        page: Results page to fetch
+        
+    Yields:
+        Dict: Book information dictionaries
+    """
+    try:
+        for book in book_manager.iter_search_books(query, filters, page):
+            yield _book_info_to_dict(book)
+    except book_manager.NoResultsError:
+        logger.info(f"No books found for query: '{query}'")
+    except Exception as e:
+        logger.error_trace(f"Error streaming book search: {e}")
 
 def get_book_info(book_id: str) -> Optional[Dict[str, Any]]:
     """Get detailed information for a specific book.
@@ -58,6 +91,9 @@ def get_book_info(book_id: str) -> Optional[Dict[str, Any]]:
 def queue_book(book_id: str, priority: int = 0) -> bool:
     """Add a book to the download queue with specified priority.
     
+    The book is accepted immediately in the resolving state; its details are
+    fetched in the background before it enters the download queue.
+    
     Args:
         book_id: Book identifier
         priority: Priority level (lower number = higher priority)
@@ -66,14 +102,27 @@ def queue_book(book_id: str, priority: int = 0) -> bool:
         bool: True if book was successfully queued
     """
     try:
-        book_info = book_manager.get_book_info(book_id)
-        book_queue.add(book_id, book_info, priority)
-        logger.info(f"Book queued with priority {priority}: {book_info.title}")
+        if book_queue.admit(book_id, priority):
+            _resolver_executor.submit(_resolve_queued_book, book_id)
+            logger.info(f"Book accepted with priority {priority}, resolving details: {book_id}")
         return True
     except Exception as e:
         logger.error_trace(f"Error queueing book: {e}")
         return False
 
+def _resolve_queued_book(book_id: str) -> None:
+    """Fetch the details of an admitted book and move it to the download queue."""
+    try:
+        book_info = book_manager.get_book_info(book_id)
+    except Exception as e:
+        logger.error_trace(f"Error resolving queued book {book_id}: {e}")
+        book_queue.fail_resolution(book_id)
+        return
+    if book_queue.resolve(book_id, book_info):
+        logger.info(f"Book queued with priority {book_info.priority}: {book_info.title}")
+    else:
+        logger.info(f"Book cancelled while resolving: {book_id}")
+
 def queue_status() -> Dict[str, Dict[str, Any]]:
     """Get current status of the download queue.
     
@@ -152,7 +201,7 @@ def _download_book_with_cancellation(book_id: str, cancel_flag: Event) -> Option
             return None
         
         progress_callback = lambda progress: update_download_progress(book_id, progress)
-        success = book_manager.download_book(book_info, book_path, progress_callback, cancel_flag)
+        success = book_manager.download_book(book_info, book_path, progress_callback, cancel_flag, PARK_COUNTDOWNS)
         
         # Stop progress updates
         cancel_flag.wait(0.1)  # Brief pause for progress thread cleanup
@@ -210,6 +259,8 @@ def _download_book_with_cancellation(book_id: str, cancel_flag: Event) -> Option
                 subprocess.run([CUSTOM_SCRIPT_AFTER_MOVING, final_path])
                         
         return str(final_path)
+    except book_manager.DownloadParked:
+        raise
     except Exception as e:
         if cancel_flag.is_set():
             logger.info(f"Download cancelled during error handling: {book_id}")
@@ -230,7 +281,10 @@ def cancel_download(book_id: str) -> bool:
     Returns:
         bool: True if cancellation was successful
     """
-    return book_queue.cancel_download(book_id)
+    if not book_queue.cancel_download(book_id):
+        return False
+    book_manager.discard_parked(book_id)
+    return True
 
 def set_book_priority(book_id: str, priority: int) -> bool:
     """Set priority for a queued book.
@@ -263,6 +317,14 @@ def get_active_downloads() -> List[str]:
     """Get list of currently active downloads."""
     return book_queue.get_active_downloads()
 
+def get_network_stats() -> Dict[str, int]:
+    """Get HTTP connection reuse counters and the number of stalled transfers."""
+    return {**network.session_manager.stats(), "stalled_transfers": downloader.transfer_watchdog.stalls}
+
+def get_source_stats() -> List[Dict[str, Any]]:
+    """Get the download statistics of each source class and host."""
+    return book_manager.get_source_stats()
+
 def clear_completed() -> int:
     """Clear all completed downloads from tracking."""
     return book_queue.clear_completed()
@@ -271,7 +333,11 @@ def _process_single_download(book_id: str, cancel_flag: Event) -> None:
     """Process a single download job."""
     try:
         book_queue.update_status(book_id, QueueStatus.DOWNLOADING)
-        download_path = _download_book_with_cancellation(book_id, cancel_flag)
+        try:
+            download_path = _download_book_with_cancellation(book_id, cancel_flag)
+        except book_manager.DownloadParked as e:
+            _park_download(book_id, e.delay)
+            return
         
         if cancel_flag.is_set():
             book_queue.update_status(book_id, QueueStatus.CANCELLED)
@@ -297,14 +363,34 @@ def _process_single_download(book_id: str, cancel_flag: Event) -> None:
             logger.info(f"Download cancelled: {book_id}")
             book_queue.update_status(book_id, QueueStatus.CANCELLED)
 
+def _park_download(book_id: str, delay: float) -> None:
+    """Free the download slot of a book while it waits for a countdown, and queue it again afterwards."""
+    if not book_queue.park(book_id):
+        # Cancelled while its link was being resolved
+        book_manager.discard_parked(book_id)
+        return
+    logger.info(f"Waiting {delay}s for a countdown, freeing the download slot of {book_id}")
+    _countdown_timers.schedule(delay, lambda: _unpark_download(book_id))
+
+def _unpark_download(book_id: str) -> None:
+    if book_queue.unpark(book_id):
+        logger.info(f"Countdown over, queuing {book_id} again")
+
 def concurrent_download_loop() -> None:
-    """Main download coordinator using ThreadPoolExecutor for concurrent downloads."""
+    """Main download coordinator using ThreadPoolExecutor for concurrent downloads.
+    
+    Sleeps until the queue signals a change (a book queued, requeued, reprioritized
+    or cancelled) or a download finishes, instead of polling.
+    """
     logger.info(f"Starting concurrent download loop with {MAX_CONCURRENT_DOWNLOADS} workers")
     
     with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS, thread_name_prefix="BookDownload") as executor:
         active_futures: Dict[Future, str] = {}  # Track active download futures
         
         while True:
+            # Read before looking at the queue, so that changes made meanwhile wake up the wait below
+            version = book_queue.version
+            
             # Clean up completed futures
             completed_futures = [f for f in active_futures if f.done()]
             for future in completed_futures:
@@ -325,10 +411,10 @@ def concurrent_download_loop() -> None:
                 
                 # Submit download job to thread pool
                 future = executor.submit(_process_single_download, book_id, cancel_flag)
+                future.add_done_callback(lambda _: book_queue.notify())
                 active_futures[future] = book_id
             
-            # Brief sleep to prevent busy waiting
-            time.sleep(MAIN_LOOP_SLEEP_TIME)
+            book_queue.wait_for_change(version)
 
 # Start concurrent download coordinator
 download_coordinator_thread = threading.Thread(
@@ -0,0 +1,163 @@
+"""Persistent SQLite cache for parsed book information."""
+
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from logger import setup_logger
+from models import BookInfo
+
+logger = setup_logger(__name__)
+
+# Fields describing the book itself. Queue state (priority, progress, download_path)
+# is never cached and download_urls are stored separately with their own TTL.
+# The links found on the AA book page are stored with the metadata, since they
+# come from the same page.
+_METADATA_FIELDS = ["id", "title", "preview", "author", "publisher", "year", "language", "format", "size", "info"]
+
+
+@dataclass
+class CachedBookInfo:
+    """A cache hit, with the freshness of each part of the entry."""
+    book_info: BookInfo
+    metadata_fresh: bool
+    links_fresh: bool
+    has_links: bool
+    page_links: Optional[Dict[str, List[str]]] = None
+
+
+class BookInfoCache:
+    """Size-bounded SQLite (WAL mode) cache of BookInfo metadata and download links.
+
+    Metadata and download links are timestamped separately so they can expire at
+    different rates. Expired entries are still returned (flagged as stale) so callers
+    can serve them while refreshing in the background.
+    """
+
+    def __init__(self, path: Path, max_entries: int, metadata_ttl: float, links_ttl: float) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.metadata_ttl = metadata_ttl
+        self.links_ttl = links_ttl
+        self._lock = Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if max_entries > 0:
+            self._open()
+
+    def _open(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS book_info ("
+                " book_id TEXT PRIMARY KEY,"
+                " metadata TEXT,"
+                " metadata_at REAL,"
+                " links TEXT,"
+                " links_at REAL,"
+                " page_links TEXT,"
+                " accessed_at REAL NOT NULL)"
+            )
+            # Caches created before page_links was added
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(book_info)")}
+            if "page_links" not in columns:
+                conn.execute("ALTER TABLE book_info ADD COLUMN page_links TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS book_info_accessed_at ON book_info (accessed_at)")
+            self._conn = conn
+            logger.info(f"Book info cache opened at {self.path}")
+        except Exception as e:
+            logger.warning(f"Book info cache disabled, failed to open {self.path}: {e}")
+            self._conn = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._conn is not None
+
+    def get(self, book_id: str) -> Optional[CachedBookInfo]:
+        """Return the cached entry for book_id, or None if there is no metadata cached."""
+        if self._conn is None:
+            return None
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT metadata, metadata_at, links, links_at, page_links FROM book_info WHERE book_id = ?",
+                    (book_id,),
+                ).fetchone()
+                if row is None or row[0] is None:
+                    return None
+                self._conn.execute("UPDATE book_info SET accessed_at = ? WHERE book_id = ?", (time.time(), book_id))
+        except sqlite3.Error as e:
+            logger.warning(f"Book info cache read failed for {book_id}: {e}")
+            return None
+
+        metadata, metadata_at, links, links_at, page_links = row
+        now = time.time()
+        book_info = BookInfo(**json.loads(metadata))
+        if links is not None:
+            book_info.download_urls = json.loads(links)
+        return CachedBookInfo(
+            book_info=book_info,
+            metadata_fresh=now - metadata_at < self.metadata_ttl,
+            links_fresh=links is not None and now - links_at < self.links_ttl,
+            has_links=links is not None,
+            page_links=json.loads(page_links) if page_links is not None else None,
+        )
+
+    def put(self, book_info: BookInfo, links: Optional[List[str]] = None, page_links: Optional[Dict[str, List[str]]] = None) -> None:
+        """Store the metadata of book_info, and its download links if given.
+
+        Args:
+            book_info: Book whose metadata is stored
+            links: Full list of download links, in order of preference
+            page_links: Links found on the AA book page, by kind of source
+        """
+        if self._conn is None:
+            return
+        metadata: Dict[str, Any] = {field: getattr(book_info, field) for field in _METADATA_FIELDS}
+        now = time.time()
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO book_info (book_id, metadata, metadata_at, accessed_at) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT(book_id) DO UPDATE SET metadata = excluded.metadata,"
+                    " metadata_at = excluded.metadata_at, accessed_at = excluded.accessed_at",
+                    (book_info.id, json.dumps(metadata), now, now),
+                )
+                if page_links is not None:
+                    self._conn.execute(
+                        "UPDATE book_info SET page_links = ? WHERE book_id = ?",
+                        (json.dumps(page_links), book_info.id),
+                    )
+                if links is not None:
+                    self._conn.execute(
+                        "UPDATE book_info SET links = ?, links_at = ? WHERE book_id = ?",
+                        (json.dumps(links), now, book_info.id),
+                    )
+                self._prune()
+        except sqlite3.Error as e:
+            logger.warning(f"Book info cache write failed for {book_info.id}: {e}")
+
+    def _prune(self) -> None:
+        """Drop the least recently used entries beyond max_entries."""
+        assert self._conn is not None
+        self._conn.execute(
+            "DELETE FROM book_info WHERE book_id IN ("
+            " SELECT book_id FROM book_info ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def invalidate(self, book_id: str) -> None:
+        """Remove a single entry from the cache."""
+        if self._conn is None:
+            return
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM book_info WHERE book_id = ?", (book_id,))
+        except sqlite3.Error as e:
+            logger.warning(f"Book info cache invalidation failed for {book_id}: {e}")
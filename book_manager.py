@@ -1,37 +1,276 @@
 """Book download manager handling search and retrieval operations."""
 
-import time, json, re, logging
+import time, json, re, logging, copy
 from pathlib import Path
-from urllib.parse import quote
-from typing import List, Optional, Dict, Union, Callable, Set
-from threading import Event
+import os
+from urllib.parse import quote, urlparse
+from typing import List, Optional, Dict, Union, Callable, Set, Tuple, Iterable, Iterator
+from threading import Event, Lock
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed, wait, FIRST_COMPLETED, TimeoutError as FuturesTimeoutError
 from bs4 import BeautifulSoup, Tag, NavigableString, ResultSet
 
 import downloader
+from cache import TTLCache, SingleFlight
+from book_info_cache import BookInfoCache
+from html_parser import parse_html, parse_table_rows, iter_table_rows
 from logger import setup_logger
 from config import SUPPORTED_FORMATS, BOOK_LANGUAGE, AA_BASE_URL
-from env import AA_DONATOR_KEY, USE_CF_BYPASS, PRIORITIZE_WELIB, ALLOW_USE_WELIB
+from env import AA_DONATOR_KEY, USE_CF_BYPASS, PRIORITIZE_WELIB, ALLOW_USE_WELIB, SEARCH_CACHE_TTL, SEARCH_CACHE_SIZE, SEARCH_PARTIAL_PARSE
+from env import SEARCH_MAX_PAGES, SEARCH_PAGE_WORKERS
+from env import CACHE_DIR, BOOK_INFO_CACHE_SIZE, BOOK_INFO_METADATA_TTL, BOOK_INFO_LINKS_TTL, WELIB_TIMEOUT
+from env import VERIFY_MD5, HEDGE_DOWNLOADS, HEDGE_FIRST_BYTE_TIMEOUT, HEDGE_MIN_SPEED
+from env import ADAPTIVE_SOURCE_ORDER, SOURCE_EXPLORATION_RATE
+from env import RESOLVED_URL_CACHE_TTL, RESOLVED_URL_NEGATIVE_TTL
 from models import BookInfo, SearchFilters
+from source_stats import SourceStatsStore
 logger = setup_logger(__name__)
 
+# Parsed search results, keyed on the normalized query and filters
+_search_cache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+# Ads and logged-in-only rows interleaved with the search results
+_SKIPPED_ROW_CLASSES = ("aa-logged-in", "ad")
+
+_MD5_PATTERN = re.compile(r"[0-9a-f]{32}")
+# Coalesces identical searches and book info lookups that are in flight at the same time
+_inflight = SingleFlight()
+# Parsed book pages, persisted across restarts
+_book_info_cache = BookInfoCache(
+    CACHE_DIR / "book_info.sqlite3",
+    max_entries=BOOK_INFO_CACHE_SIZE,
+    metadata_ttl=BOOK_INFO_METADATA_TTL,
+    links_ttl=BOOK_INFO_LINKS_TTL,
+)
+# Background refreshes of stale book info cache entries
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="BookInfoRefresh")
+_refreshing: Set[str] = set()
+_refreshing_lock = Lock()
+# Secondary sources (welib) looked up in parallel with the AA book page
+_source_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="BookSource")
+
+_source_stats = SourceStatsStore(CACHE_DIR / "source_stats.sqlite3", SOURCE_EXPLORATION_RATE)
+
+# Final download URL extracted from each source link ("" if none could be extracted).
+# Both kinds of entries get their own TTL, so either can be disabled without the other.
+_resolved_urls = TTLCache(maxsize=1024, ttl=max(RESOLVED_URL_CACHE_TTL, RESOLVED_URL_NEGATIVE_TTL))
+# Sources that are never pushed back to explore slower ones
+_FAST_SOURCES = {"aa_fast"}
+# Sources whose download URLs embed short-lived tokens, with the longest they are cached for
+_RESOLVED_URL_MAX_TTLS = {"aa_fast": 300, "z-lib": 300}
+
+# Parked downloads, with the links left to try, their destination and the countdowns
+# the first link may still ask to wait for, and the shortest countdown worth parking for
+_parked_links: Dict[str, Tuple[List[str], Path, int]] = {}
+_parked_links_lock = Lock()
+_PARK_MIN_COUNTDOWN = 10
+# Countdowns waited for on a source page before giving up on it
+_MAX_COUNTDOWNS = 3
+
+
+class NoResultsError(Exception):
+    """Raised when a search results page holds no books, as opposed to failing to be fetched."""
+
+    def __init__(self) -> None:
+        super().__init__("No books found. Please try another query.")
+
+
+class DownloadParked(Exception):
+    """Raised instead of blocking a download thread while a partner server countdown runs."""
+
+    def __init__(self, delay: float, retries_left: int) -> None:
+        super().__init__(f"Download available in {delay} seconds")
+        self.delay = delay
+        self.retries_left = retries_left
+
+
+# Hedged downloads run at most this many sources at once, and judge speed after this many seconds
+_HEDGE_MAX_ATTEMPTS = 2
+_HEDGE_SPEED_WINDOW = 10
+
+def _search_cache_key(query: str, filters: SearchFilters) -> Tuple:
+    """Build a cache key from the normalized query and search filters.
+
+    List filters are sorted and the configured defaults are folded in, so
+    equivalent searches map to the same entry regardless of parameter order.
+    """
+    def _normalize(values: Optional[List[str]]) -> Tuple[str, ...]:
+        return tuple(sorted({v.strip().lower() for v in values or [] if v.strip()}))
+
+    return (
+        " ".join(query.split()).lower(),
+        _normalize(filters.isbn),
+        _normalize(filters.author),
+        _normalize(filters.title),
+        _normalize(filters.lang or BOOK_LANGUAGE),
+        (filters.sort or "").strip().lower(),
+        _normalize(filters.content),
+        _normalize(filters.format or SUPPORTED_FORMATS),
+    )
 
 
-def search_books(query: str, filters: SearchFilters) -> List[BookInfo]:
+def search_books(query: str, filters: SearchFilters, page: int = 1, max_pages: int = 1) -> Tuple[List[BookInfo], Optional[int]]:
     """Search for books matching the query.
 
     Args:
         query: Search term (ISBN, title, author, etc.)
+        filters: Search filters
+        page: First AA results page to fetch (1-based)
+        max_pages: Number of consecutive pages to fetch, concurrently
 
     Returns:
-        List[BookInfo]: List of matching books
+        Tuple[List[BookInfo], Optional[int]]: Matching books, de-duplicated and sorted
+        by format preference, and the next page to request (None if exhausted).
+        If a later page could not be fetched, the next page is that page, so that
+        the client can retry it.
 
     Raises:
-        Exception: If no books found or parsing fails
+        NoResultsError: If the first page has no books
+        Exception: If the first page can't be fetched or parsing fails
     """
-    logger.info(f"Starting search for query: '{query}'")
+    logger.info(f"Starting search for query: '{query}' (page {page}, max_pages {max_pages})")
     if logger.isEnabledFor(logging.DEBUG):
         logger.debug(f"Search filters: {filters}")
-    
+
+    page = max(1, page)
+    max_pages = max(1, min(max_pages, SEARCH_MAX_PAGES))
+    pages = list(range(page, page + max_pages))
+
+    results: Dict[int, List[BookInfo]] = {}
+    failed: Set[int] = set()
+    if len(pages) == 1:
+        results[page] = _search_page(query, filters, page)
+    else:
+        with ThreadPoolExecutor(max_workers=min(SEARCH_PAGE_WORKERS, len(pages)), thread_name_prefix="SearchPage") as executor:
+            futures = {executor.submit(_search_page, query, filters, p): p for p in pages}
+            for future in as_completed(futures):
+                try:
+                    results[futures[future]] = future.result()
+                except NoResultsError:
+                    if futures[future] == page:
+                        raise
+                    results[futures[future]] = []
+                except Exception as e:
+                    # The first page is mandatory and its errors are reported to the caller
+                    if futures[future] == page:
+                        raise
+                    logger.warning(f"Failed to fetch page {futures[future]} for query: '{query}': {e}")
+                    failed.add(futures[future])
+
+    books: List[BookInfo] = []
+    seen_ids: Set[str] = set()
+    last_page = page
+    next_page: Optional[int] = None
+    for p in pages:
+        if p in failed:
+            # Pages after a failed one are not returned, the client resumes from it
+            next_page = p
+            break
+        last_page = p
+        if not results[p]:
+            break
+        for book in results[p]:
+            if book.id not in seen_ids:
+                seen_ids.add(book.id)
+                books.append(book)
+    else:
+        next_page = last_page + 1
+
+    books.sort(key=_format_rank)
+    logger.info(f"Returning {len(books)} books from {last_page - page + 1} page(s) for query: '{query}'")
+    return books, next_page
+
+
+def _format_rank(book: BookInfo) -> int:
+    """Sort key ranking books by their position in SUPPORTED_FORMATS."""
+    return SUPPORTED_FORMATS.index(book.format) if book.format in SUPPORTED_FORMATS else len(SUPPORTED_FORMATS)
+
+
+def _search_page(query: str, filters: SearchFilters, page: int) -> List[BookInfo]:
+    """Get a single page of search results, from the cache when possible."""
+    cache_key = _search_cache_key(query, filters) + (page,)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Using {len(cached)} cached books for query: '{query}', page {page} ({_search_cache.stats()})")
+        return list(cached)
+
+    books, shared = _inflight.do(("search", cache_key), _fetch_search_results, query, filters, page, cache_key)
+    if shared:
+        logger.info(f"Joined in-flight search for query: '{query}', page {page}")
+    return list(books)
+
+
+def _fetch_search_results(query: str, filters: SearchFilters, page: int, cache_key: Tuple) -> List[BookInfo]:
+    """Fetch and parse one AA search results page, then store it in the search cache."""
+    html, _ = _inflight.do(("search_html", cache_key), _fetch_search_page_html, query, filters, page)
+    rows = _extract_search_result_rows(html)
+
+    if rows is None:
+        logger.warning(f"No results table found for query: {query}")
+        # Log the HTML structure for debugging (limité en production)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"HTML structure received: {html[:200]}...")
+        raise NoResultsError()
+
+    books = list(_parse_search_rows(rows, query))
+    books.sort(key=_format_rank)
+
+    _search_cache.set(cache_key, list(books))
+    return books
+
+
+def iter_search_books(query: str, filters: SearchFilters, page: int = 1) -> Iterator[BookInfo]:
+    """Search for books matching the query, yielding each result as soon as its row is parsed.
+
+    Unlike search_books, results come in page order rather than sorted by format,
+    since the full page is not known when the first books are yielded.
+
+    Args:
+        query: Search term (ISBN, title, author, etc.)
+        filters: Search filters
+        page: AA results page to fetch (1-based)
+
+    Yields:
+        BookInfo: Matching books
+
+    Raises:
+        NoResultsError: If the page has no books
+        Exception: If the page can't be fetched or parsing fails
+    """
+    logger.info(f"Starting streaming search for query: '{query}' (page {page})")
+    cache_key = _search_cache_key(query, filters) + (max(1, page),)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"Streaming {len(cached)} cached books for query: '{query}', page {page}")
+        yield from cached
+        return
+
+    html, _ = _inflight.do(("search_html", cache_key), _fetch_search_page_html, query, filters, max(1, page))
+    books: List[BookInfo] = []
+
+    rows = iter_table_rows(html, skip_classes=_SKIPPED_ROW_CLASSES) if SEARCH_PARTIAL_PARSE else None
+    if rows is not None:
+        for book in _parse_search_rows(rows, query):
+            books.append(book)
+            yield book
+
+    if not books:
+        rows = _extract_search_result_rows(html, partial=False)
+        if rows is None:
+            logger.warning(f"No results table found for query: {query}")
+            raise NoResultsError()
+        for book in _parse_search_rows(rows, query):
+            books.append(book)
+            yield book
+
+    books.sort(key=_format_rank)
+    _search_cache.set(cache_key, books)
+
+
+def _fetch_search_page_html(query: str, filters: SearchFilters, page: int) -> str:
+    """Build the AA search URL for the query, filters and page, and fetch it.
+
+    Raises:
+        Exception: If the page can't be fetched or has no results
+    """
     query_html = quote(query)
 
     if filters.isbn:
@@ -68,7 +307,7 @@ def search_books(query: str, filters: SearchFilters) -> List[BookInfo]:
 
     url = (
         f"{AA_BASE_URL}"
-        f"/search?index=&page=1&display=table"
+        f"/search?index=&page={page}&display=table"
         f"&acc=aa_download&acc=external_download"
         f"&ext={'&ext='.join(formats_to_use)}"
         f"&q={query_html}"
@@ -85,59 +324,63 @@ def search_books(query: str, filters: SearchFilters) -> List[BookInfo]:
 
     if "No files found." in html:
         logger.info(f"No books found for query: {query}")
-        raise Exception("No books found. Please try another query.")
+        raise NoResultsError()
 
-    soup = BeautifulSoup(html, "html.parser")
-    tbody: Tag | NavigableString | None = soup.find("table")
+    return html
 
-    if not tbody:
-        logger.warning(f"No results table found for query: {query}")
-        # Log the HTML structure for debugging (limité en production)
-        if logger.isEnabledFor(logging.DEBUG):
-            logger.debug(f"HTML structure received: {html[:200]}...")
-        raise Exception("No books found. Please try another query.")
 
-    books = []
+def _parse_search_rows(rows: Iterable[Tag], query: str) -> Iterator[BookInfo]:
+    """Parse search result rows into books, logging a summary once all rows are consumed."""
     total_rows = 0
     successful_parses = 0
     failed_parses = 0
-    
-    if isinstance(tbody, Tag):
-        rows = tbody.find_all("tr")
-        total_rows = len(rows)
-        logger.debug(f"Found {total_rows} rows in search results table")
-        
-        for line_tr in rows:
-            try:
-                book = _parse_search_result_row(line_tr)
-                if book:
-                    books.append(book)
-                    successful_parses += 1
-                else:
-                    failed_parses += 1
-            except Exception as e:
-                logger.error(f"Failed to parse search result row: {e}", exc_info=True)
+    sample_row = None
+
+    for line_tr in rows:
+        total_rows += 1
+        if sample_row is None:
+            sample_row = line_tr
+        try:
+            book = _parse_search_result_row(line_tr)
+            if book:
+                successful_parses += 1
+                yield book
+            else:
                 failed_parses += 1
+        except Exception as e:
+            logger.error(f"Failed to parse search result row: {e}", exc_info=True)
+            failed_parses += 1
     
     logger.info(f"Search parsing complete: {successful_parses} successful, {failed_parses} failed out of {total_rows} total rows")
     
-    if not books and total_rows > 0:
+    if not successful_parses and total_rows > 0:
         logger.warning(f"No books were successfully parsed from {total_rows} rows. This might indicate a structure change in the search results.")
         # Log a sample of the HTML structure for debugging (limité en production)
-        if total_rows > 0 and logger.isEnabledFor(logging.DEBUG):
-            sample_row = tbody.find_all("tr")[0]
+        if logger.isEnabledFor(logging.DEBUG):
             logger.debug(f"Sample row HTML structure: {str(sample_row)[:200]}...")
 
-    books.sort(
-        key=lambda x: (
-            SUPPORTED_FORMATS.index(x.format)
-            if x.format in SUPPORTED_FORMATS
-            else len(SUPPORTED_FORMATS)
-        )
-    )
 
-    logger.info(f"Returning {len(books)} books for query: '{query}'")
-    return books
+def _extract_search_result_rows(html: str, partial: bool = SEARCH_PARTIAL_PARSE) -> Optional[List[Tag]]:
+    """Extract the rows of the search results table.
+
+    With partial parsing, only the results table is parsed and ad rows are
+    dropped before tree construction. Falls back to parsing the full page if
+    that yields nothing.
+
+    Returns:
+        The table rows, or None if the page has no results table
+    """
+    if partial:
+        rows = parse_table_rows(html, skip_classes=_SKIPPED_ROW_CLASSES)
+        if rows:
+            return rows
+        logger.debug("Partial parsing found no result rows, parsing the full page")
+
+    soup = parse_html(html)
+    tbody: Tag | NavigableString | None = soup.find("table")
+    if not isinstance(tbody, Tag):
+        return None
+    return tbody.find_all("tr")
 
 
 def _parse_search_result_row(row: Tag) -> Optional[BookInfo]:
@@ -245,25 +488,182 @@ def _parse_search_result_row(row: Tag) -> Optional[BookInfo]:
 def get_book_info(book_id: str) -> BookInfo:
     """Get detailed information for a specific book.
 
+    Only the AA book page is fetched. Download links, which may require the
+    Cloudflare bypasser, are resolved separately by resolve_download_urls once
+    the book is actually downloaded.
+
     Args:
         book_id: Book identifier (MD5 hash)
 
     Returns:
         BookInfo: Detailed book information
     """
+    cached = _book_info_cache.get(book_id)
+    if cached is not None:
+        if not cached.metadata_fresh:
+            # Serve the stale entry right away and refresh it for the next caller
+            _refresh_book_info_async(book_id)
+        logger.debug(f"Using cached book info for ID: {book_id} (metadata fresh: {cached.metadata_fresh})")
+        return cached.book_info
+
+    book_info, shared = _inflight.do(("info", book_id), _load_book_info, book_id)
+    if shared:
+        # Callers may mutate their BookInfo (priority, download_urls...), so don't hand out the same instance
+        logger.debug(f"Shared in-flight book info lookup for ID: {book_id}")
+        return copy.deepcopy(book_info)
+    return book_info
+
+
+def _load_book_info(book_id: str) -> BookInfo:
+    """Fetch book metadata from upstream and store it in the persistent cache."""
+    book_info, page_links = _fetch_book_info(book_id)
+    # Links found on the AA page alone are incomplete, the others are resolved at download time
+    book_info.download_urls = []
+    _book_info_cache.put(book_info, page_links=page_links)
+    return book_info
+
+
+def resolve_download_urls(book_id: str) -> List[str]:
+    """Resolve the download links of a book, including welib.org ones.
+
+    Resolved links are memoized per book in the persistent cache for
+    BOOK_INFO_LINKS_TTL seconds. If resolving fails, stale links are used.
+
+    Args:
+        book_id: Book identifier (MD5 hash)
+
+    Returns:
+        List[str]: Download links, in order of preference
+    """
+    cached = _book_info_cache.get(book_id)
+    if cached is not None and cached.links_fresh:
+        logger.debug(f"Using cached download links for ID: {book_id}")
+        return list(cached.book_info.download_urls)
+
+    try:
+        urls, _ = _inflight.do(("links", book_id), _load_download_urls, book_id)
+    except Exception as e:
+        if cached is None or not cached.has_links:
+            raise
+        logger.warning(f"Failed to resolve download links for ID: {book_id}, using stale ones: {e}")
+        return list(cached.book_info.download_urls)
+    return list(urls)
+
+
+def _load_download_urls(book_id: str) -> List[str]:
+    """Resolve all the download links of a book and store them in the persistent cache.
+
+    The links of the AA book page are taken from the cache when its metadata is
+    fresh, so only welib.org is looked up. Otherwise the AA page is fetched again,
+    concurrently with welib.org.
+    """
+    cached = _book_info_cache.get(book_id)
+    if cached is not None and cached.metadata_fresh and cached.page_links is not None:
+        logger.debug(f"Using cached AA page links for ID: {book_id}")
+        book_info = cached.book_info
+        welib_future = _source_executor.submit(_get_download_urls_from_welib, book_id) if USE_CF_BYPASS else None
+        book_info.download_urls = _order_download_urls(cached.page_links, _welib_result(welib_future, book_id))
+        _book_info_cache.put(book_info, links=list(book_info.download_urls))
+        return book_info.download_urls
+
+    book_info, page_links = _fetch_book_info(book_id, resolve_links=True)
+    _book_info_cache.put(book_info, links=list(book_info.download_urls), page_links=page_links)
+    return book_info.download_urls
+
+
+def _refresh_book_info_async(book_id: str) -> None:
+    """Schedule a background refresh of a cached book, unless one is already pending."""
+    with _refreshing_lock:
+        if book_id in _refreshing:
+            return
+        _refreshing.add(book_id)
+
+    def _refresh() -> None:
+        try:
+            _inflight.do(("info", book_id), _load_book_info, book_id)
+            logger.debug(f"Refreshed cached book info for ID: {book_id}")
+        except Exception as e:
+            logger.warning(f"Background refresh of book info failed for ID: {book_id}: {e}")
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(book_id)
+
+    _refresh_executor.submit(_refresh)
+
+
+def _fetch_book_info(book_id: str, resolve_links: bool = False) -> Tuple[BookInfo, Dict[str, List[str]]]:
+    """Fetch and parse the AA book page for a single book.
+
+    Args:
+        book_id: Book identifier (MD5 hash)
+        resolve_links: Also look up welib.org download links. The lookup runs
+            concurrently with the AA fetch, so latency is that of the slowest
+            source rather than the sum of both.
+
+    Returns:
+        Tuple[BookInfo, Dict[str, List[str]]]: The book, with its download links
+        in order of preference, and the links found on the AA page by kind of source
+    """
+    welib_future = None
+    if resolve_links and USE_CF_BYPASS:
+        welib_future = _source_executor.submit(_get_download_urls_from_welib, book_id)
+
     url = f"{AA_BASE_URL}/md5/{book_id}"
-    html = downloader.html_get_page(url)
+    try:
+        html = downloader.html_get_page(url)
+    except BaseException:
+        if welib_future is not None:
+            welib_future.cancel()
+        raise
 
     if not html:
+        if welib_future is not None:
+            welib_future.cancel()
         raise Exception(f"Failed to fetch book info for ID: {book_id}")
 
-    soup = BeautifulSoup(html, "html.parser")
+    soup = parse_html(html)
 
-    return _parse_book_info_page(soup, book_id)
+    book_info, page_links = _parse_book_info_page(soup, book_id)
+    book_info.download_urls = _order_download_urls(page_links, _welib_result(welib_future, book_id))
+    return book_info, page_links
+
+
+def _welib_result(welib_future: Optional[Future], book_id: str) -> Set[str]:
+    """Wait for a concurrent welib lookup, giving up after WELIB_TIMEOUT."""
+    if welib_future is None:
+        return set()
+    try:
+        return welib_future.result(timeout=WELIB_TIMEOUT)
+    except FuturesTimeoutError:
+        logger.warning(f"welib.org lookup for {book_id} timed out after {WELIB_TIMEOUT}s, continuing without it")
+    except Exception as e:
+        logger.warning(f"welib.org lookup for {book_id} failed, continuing without it: {e}")
+    return set()
 
 
-def _parse_book_info_page(soup: BeautifulSoup, book_id: str) -> BookInfo:
-    """Parse the book info page HTML into a BookInfo object."""
+def _order_download_urls(page_links: Dict[str, List[str]], welib_urls: Iterable[str]) -> List[str]:
+    """Merge the links of the AA book page and welib.org, in order of preference."""
+    urls: List[str] = []
+    urls += list(welib_urls) if PRIORITIZE_WELIB else []
+    urls += page_links.get("slow_no_waitlist", []) if USE_CF_BYPASS else []
+    urls += page_links.get("libgen", [])
+    urls += list(welib_urls) if not PRIORITIZE_WELIB else []
+    urls += page_links.get("slow_with_waitlist", []) if USE_CF_BYPASS else []
+    urls += page_links.get("z_lib", [])
+    return urls
+
+
+def _parse_book_info_page(soup: BeautifulSoup, book_id: str) -> Tuple[BookInfo, Dict[str, List[str]]]:
+    """Parse the book info page HTML into a BookInfo object.
+
+    Args:
+        soup: Parsed AA book page
+        book_id: Book identifier (MD5 hash)
+
+    Returns:
+        Tuple[BookInfo, Dict[str, List[str]]]: The book, without download links,
+        and the absolute links found on the page by kind of source
+    """
     if logger.isEnabledFor(logging.DEBUG):
         logger.debug(f"Parsing book info page for ID: {book_id}")
     
@@ -306,7 +706,6 @@ def _parse_book_info_page(soup: BeautifulSoup, book_id: str) -> BookInfo:
     slow_urls_with_waitlist = set()
     external_urls_libgen = set()
     external_urls_z_lib = set()
-    external_urls_welib = set()
 
     for url in every_url:
         try:
@@ -337,21 +736,16 @@ def _parse_book_info_page(soup: BeautifulSoup, book_id: str) -> BookInfo:
         except:
             pass
 
-    external_urls_welib = _get_download_urls_from_welib(book_id) if USE_CF_BYPASS else set()
-
-    urls = []
-    urls += list(external_urls_welib) if PRIORITIZE_WELIB else []
-    urls += list(slow_urls_no_waitlist) if USE_CF_BYPASS else []
-    urls += list(external_urls_libgen)
-    urls += list(external_urls_welib) if not PRIORITIZE_WELIB else []
-    urls += list(slow_urls_with_waitlist)  if USE_CF_BYPASS else []
-    urls += list(external_urls_z_lib)
-
-    for i in range(len(urls)):
-        urls[i] = downloader.get_absolute_url(AA_BASE_URL, urls[i])
+    def _absolute(urls: Set[str]) -> List[str]:
+        # Remove empty urls
+        return [url for url in (downloader.get_absolute_url(AA_BASE_URL, url) for url in urls) if url != ""]
 
-    # Remove empty urls
-    urls = [url for url in urls if url != ""]
+    page_links = {
+        "slow_no_waitlist": _absolute(slow_urls_no_waitlist),
+        "libgen": _absolute(external_urls_libgen),
+        "slow_with_waitlist": _absolute(slow_urls_with_waitlist),
+        "z_lib": _absolute(external_urls_z_lib),
+    }
 
     # Filter out divs that are not text
     original_divs = divs
@@ -434,7 +828,6 @@ def _parse_book_info_page(soup: BeautifulSoup, book_id: str) -> BookInfo:
         author=author,
         format=format,
         size=size,
-        download_urls=urls,
     )
 
     # Extraction sécurisée des métadonnées
@@ -455,7 +848,7 @@ def _parse_book_info_page(soup: BeautifulSoup, book_id: str) -> BookInfo:
     if info.get("Year"):
         book_info.year = info["Year"][0]
 
-    return book_info
+    return book_info, page_links
 
 def _get_download_urls_from_welib(book_id: str) -> set[str]:
     """Get download urls from welib.org."""
@@ -475,7 +868,7 @@ def _get_download_urls_from_welib(book_id: str) -> set[str]:
             logger.warning(f"Failed to fetch welib.org page for {book_id}")
             return set()
         
-        soup = BeautifulSoup(html, "html.parser")
+        soup = parse_html(html)
         download_links = soup.find_all("a", href=True)
         
         if not download_links:
@@ -597,20 +990,66 @@ def _extract_book_metadata(
         return {}
 
 
-def download_book(book_info: BookInfo, book_path: Path, progress_callback: Optional[Callable[[float], None]] = None, cancel_flag: Optional[Event] = None) -> bool:
+def download_book(book_info: BookInfo, book_path: Path, progress_callback: Optional[Callable[[float], None]] = None, cancel_flag: Optional[Event] = None, park_countdowns: bool = False) -> bool:
     """Download a book from available sources.
 
     Args:
-        book_id: Book identifier (MD5 hash)
-        title: Book title for logging
+        book_info: Book to download
+        book_path: Destination file
+        progress_callback: Called with the download progress percentage
+        cancel_flag: Stops the download when set
+        park_countdowns: Raise DownloadParked instead of waiting for long partner server countdowns
 
     Returns:
-        Optional[BytesIO]: Book content buffer if successful
+        bool: True if the book was written to book_path. Otherwise, the partial
+        files kept for resuming the download are deleted.
+
+    Raises:
+        DownloadParked: If a countdown must be waited for. Calling download_book
+            again afterwards resumes with the source that asked to wait.
     """
+    with _parked_links_lock:
+        parked = _parked_links.pop(book_info.id, None)
+    if parked is not None:
+        download_links, _, countdown_retries = parked
+    else:
+        download_links, countdown_retries = _ordered_download_links(book_info), _MAX_COUNTDOWNS
 
-    if len(book_info.download_urls) == 0:
-        book_info = get_book_info(book_info.id)
-    download_links = book_info.download_urls
+    # The AA book id is the MD5 of the file
+    expected_md5 = book_info.id if VERIFY_MD5 and _MD5_PATTERN.fullmatch(book_info.id.lower()) else None
+
+    if HEDGE_DOWNLOADS and len(download_links) > 1:
+        return _download_hedged(download_links, book_info, book_path, progress_callback, cancel_flag, expected_md5)
+
+    for index, link in enumerate(download_links):
+        try:
+            # Only the link that was parked has used up some of its countdowns
+            retries = countdown_retries if index == 0 else _MAX_COUNTDOWNS
+            if _download_from_link(link, book_info, book_path, progress_callback, cancel_flag, expected_md5, park=park_countdowns, countdown_retries=retries):
+                return True
+        except DownloadParked as e:
+            # The sources before this one already failed
+            with _parked_links_lock:
+                _parked_links[book_info.id] = (download_links[index:], book_path, e.retries_left)
+            raise
+
+    # Every source failed or the download was cancelled, nothing will resume it
+    downloader.discard_partial_download(book_path)
+    return False
+
+
+def discard_parked(book_id: str) -> None:
+    """Forget where a parked download was, so that the next one starts over, and delete its partial files."""
+    with _parked_links_lock:
+        parked = _parked_links.pop(book_id, None)
+    if parked is not None:
+        downloader.discard_partial_download(parked[1])
+
+
+def _ordered_download_links(book_info: BookInfo) -> List[str]:
+    """Return the download links of a book, in the order they should be tried."""
+    # Links are only resolved once a book is actually downloaded
+    download_links = resolve_download_urls(book_info.id)
 
     # If AA_DONATOR_KEY is set, use the fast download URL. Else try other sources.
     if AA_DONATOR_KEY != "":
@@ -619,33 +1058,289 @@ def download_book(book_info: BookInfo, book_path: Path, progress_callback: Optio
             f"{AA_BASE_URL}/dyn/api/fast_download.json?md5={book_info.id}&key={AA_DONATOR_KEY}",
         )
 
-    for link in download_links:
-        try:
-            download_url = _get_download_url(link, book_info.title, cancel_flag)
-            if download_url != "":
-                logger.info(f"Downloading book from server")
-                if logger.isEnabledFor(logging.DEBUG):
-                    logger.debug(f"Book: {book_info.title}, URL: {download_url}")
-
-                data = downloader.download_url(download_url, book_info.size or "", progress_callback, cancel_flag)
-                if not data:
-                    raise Exception("No data received")
-
-                logger.info(f"Download finished. Writing to file")
-                with open(book_path, "wb") as f:
-                    f.write(data.getbuffer())
-                logger.info(f"Book written successfully")
+    if ADAPTIVE_SOURCE_ORDER:
+        default_order = download_links
+        download_links = _source_stats.rank(
+            download_links, [("source", _source_class(link)) for link in download_links], _size_in_bytes(book_info.size), pinned=_FAST_SOURCES
+        )
+        if download_links != default_order:
+            logger.info(f"Trying sources in order: {', '.join(_source_class(link) for link in download_links)}")
+    return download_links
+
+
+def _download_from_link(
+    link: str,
+    book_info: BookInfo,
+    book_path: Path,
+    progress_callback: Optional[Callable[[float], None]],
+    cancel_flag: Optional[Event],
+    expected_md5: Optional[str],
+    stats: Optional[downloader.TransferStats] = None,
+    park: bool = False,
+    countdown_retries: int = _MAX_COUNTDOWNS,
+) -> bool:
+    """Download a book from a single source link, recording the outcome in the source statistics.
+
+    Args:
+        park: Raise DownloadParked instead of waiting for long partner server countdowns
+        countdown_retries: Countdowns the source page may still ask to wait for
+
+    Returns:
+        bool: True if the book was written to book_path
+
+    Raises:
+        DownloadParked: If park is set and the source asks to wait for a countdown
+    """
+    if stats is None:
+        stats = downloader.TransferStats()
+    sources = [("source", _source_class(link))]
+    resolve_started = time.monotonic()
+    resolve_time: Optional[float] = None
+    first_byte_time: Optional[float] = None
+    success = False
+    parked = False
+    contacted = True
+    try:
+        download_url, cached = _resolve_download_url(link, book_info.title, cancel_flag, park, countdown_retries)
+        resolve_time = time.monotonic() - resolve_started
+        if download_url == "":
+            # A cached negative says nothing new about the source
+            contacted = not cached
+            return False
+        sources.append(("host", _source_host(download_url)))
+        logger.info(f"Downloading book from server")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Book: {book_info.title}, URL: {download_url}")
+
+        download_started = time.monotonic()
+        if not downloader.download_url(download_url, book_path, book_info.size or "", progress_callback, cancel_flag, expected_md5, book_info.format, stats):
+            if stats.first_byte_at is None:
+                # Nothing was received, the URL may have expired: extract it again next time
+                _resolved_urls.invalidate(link)
+            raise Exception("No data received")
+
+        if expected_md5 is not None:
+            book_info.md5_verified = True
+        if stats.first_byte_at is not None:
+            first_byte_time = stats.first_byte_at - download_started
+        logger.info(f"Book written successfully")
+        success = True
+        return True
+
+    except DownloadParked:
+        parked = True
+        raise
+    except downloader.ChecksumMismatchError as e:
+        logger.warning(f"Discarding download from {link}, trying next source: {e}")
+        book_info.md5_verified = False
+        return False
+    except downloader.TransferStalledError as e:
+        logger.warning(f"{e}, trying next source")
+        book_info.stalled_sources += 1
+        return False
+    except downloader.UnexpectedContentError as e:
+        logger.warning(f"{e}, trying next source")
+        # The URL may have expired and now lead to an error page: extract it again next time
+        _resolved_urls.invalidate(link)
+        return False
+    except Exception as e:
+        if cancel_flag is not None and cancel_flag.is_set():
+            return False
+        logger.error(f"Failed to download from {link}: {e}", exc_info=True)
+        return False
+    finally:
+        # Cancelled downloads say nothing about the source, parked ones resume later
+        if contacted and not parked and (cancel_flag is None or not cancel_flag.is_set()):
+            _source_stats.record(sources, success, resolve_time, first_byte_time, stats.throughput() if success else None)
+
+
+def _is_slow_transfer(stats: downloader.TransferStats) -> bool:
+    """Whether a transfer missed the first byte deadline or stays under the minimum speed."""
+    now = time.monotonic()
+    if stats.first_byte_at is None:
+        # Includes the time spent resolving the link, e.g. waiting a countdown
+        return now - stats.started_at > HEDGE_FIRST_BYTE_TIMEOUT
+    return now - stats.first_byte_at > _HEDGE_SPEED_WINDOW and stats.throughput() < HEDGE_MIN_SPEED * 1024
+
+
+def _download_hedged(
+    download_links: List[str],
+    book_info: BookInfo,
+    book_path: Path,
+    progress_callback: Optional[Callable[[float], None]],
+    cancel_flag: Optional[Event],
+    expected_md5: Optional[str],
+) -> bool:
+    """Download a book from the first source, starting the next one in parallel while the current one is slow.
+
+    Each attempt writes to its own file. The first to complete is moved to
+    book_path and the others are cancelled. The files of attempts that fail,
+    lose or are cancelled are deleted.
+
+    Returns:
+        bool: True if the book was written to book_path
+    """
+    progress = [0.0] * len(download_links)
+    attempts: Dict[Future, Tuple[int, Path, Event, downloader.TransferStats]] = {}
+    next_index = 0
+    winner: Optional[int] = None
+
+    def report(index: int) -> Callable[[float], None]:
+        def update(value: float) -> None:
+            progress[index] = value
+            if progress_callback is not None:
+                progress_callback(max(progress))
+        return update
+
+    def run_attempt(index: int, path: Path, attempt_cancel: Event, stats: downloader.TransferStats) -> bool:
+        if _download_from_link(download_links[index], book_info, path, report(index), attempt_cancel, expected_md5, stats):
+            if not attempt_cancel.is_set():
                 return True
+            # Finished after another attempt won, or after the download was cancelled
+            path.unlink(missing_ok=True)
+            return False
+        # Attempts write to their own file, which no later download resumes
+        downloader.discard_partial_download(path)
+        return False
+
+    executor = ThreadPoolExecutor(max_workers=_HEDGE_MAX_ATTEMPTS, thread_name_prefix="HedgedDownload")
+    try:
+        while winner is None:
+            if cancel_flag is not None and cancel_flag.is_set():
+                break
+            active = [attempt for future, attempt in attempts.items() if not future.done()]
+            if next_index < len(download_links) and (
+                not active or (len(active) < _HEDGE_MAX_ATTEMPTS and all(_is_slow_transfer(stats) for _, _, _, stats in active))
+            ):
+                if active:
+                    logger.info(f"Source {_source_host(download_links[active[0][0]])} is slow, also trying {_source_host(download_links[next_index])}")
+                path = book_path.with_name(f"{book_path.name}.{next_index}")
+                attempt_cancel = Event()
+                stats = downloader.TransferStats()
+                future = executor.submit(run_attempt, next_index, path, attempt_cancel, stats)
+                attempts[future] = (next_index, path, attempt_cancel, stats)
+                next_index += 1
+                continue
+            if not active:
+                break
 
-        except Exception as e:
-            logger.error(f"Failed to download from {link}: {e}", exc_info=True)
-            continue
+            done, _ = wait([future for future in attempts if not future.done()], timeout=1, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.result():
+                    winner = attempts[future][0]
+                    break
+    finally:
+        # Losers discard their partial file once they notice the cancellation,
+        # which a source that is not sending anything may take a while to allow
+        for index, path, attempt_cancel, _ in attempts.values():
+            if index != winner:
+                attempt_cancel.set()
+        executor.shutdown(wait=False)
+
+    # Attempts still running clean up after themselves once they notice the cancellation
+    for future, (index, path, _, _) in attempts.items():
+        if index != winner and future.done():
+            path.unlink(missing_ok=True)
+            downloader.discard_partial_download(path)
+
+    if winner is None:
+        return False
+
+    for index, path, _, _ in attempts.values():
+        if index == winner:
+            os.replace(path, book_path)
+
+    losers = [_source_host(download_links[index]) for index, _, _, _ in attempts.values() if index != winner]
+    if losers:
+        logger.info(f"Hedged download of {book_info.title}: {_source_host(download_links[winner])} won over {', '.join(losers)}")
+    else:
+        logger.info(f"Hedged download of {book_info.title}: {_source_host(download_links[winner])} won without hedging")
+    return True
+
+
+def _source_host(link: str) -> str:
+    """Host of a download link, as shown in logs."""
+    return urlparse(link).netloc or link
+
+
+def _source_class(link: str) -> str:
+    """Kind of source a download link points to, which source statistics are kept for."""
+    host = urlparse(link).netloc.lower()
+    if link.startswith(f"{AA_BASE_URL}/dyn/api/fast_download.json"):
+        return "aa_fast"
+    if "welib" in host:
+        return "welib"
+    if "/slow_download/" in link:
+        # Slow download links end with the number of the partner server
+        server = link.rstrip("/").rsplit("/", 1)[-1]
+        return f"aa_slow_{server}" if server.isdigit() else "aa_slow"
+    if "libgen" in host:
+        return "libgen"
+    if host.startswith("z-lib") or ".z-lib." in host:
+        return "z-lib"
+    return host
+
+
+def get_source_stats() -> List[Dict]:
+    """Return the download statistics of each source class and host."""
+    return _source_stats.snapshot()
+
+
+def _size_in_bytes(size: Optional[str]) -> float:
+    """Parse a book size such as "1.5mb", assuming 10 MB if it is missing or invalid."""
+    units = {"kb": 1024, "mb": 1024 ** 2, "gb": 1024 ** 3}
+    if size:
+        value = size.strip().lower().replace(",", ".").replace(" ", "")
+        for unit, multiplier in units.items():
+            if value.endswith(unit):
+                try:
+                    return float(value[:-len(unit)]) * multiplier
+                except ValueError:
+                    break
+    return 10.0 * 1024 ** 2
+
+
+def _resolve_download_url(link: str, title: str, cancel_flag: Optional[Event], park: bool, countdown_retries: int = _MAX_COUNTDOWNS) -> Tuple[str, bool]:
+    """Return the download URL of a source link, extracting it from the source page only if it is not cached.
+
+    Source pages that were fetched but hold no download URL are cached too, for
+    RESOLVED_URL_NEGATIVE_TTL seconds. Pages that could not be fetched are not,
+    since the failure may be temporary.
+
+    Returns:
+        Tuple[str, bool]: The download URL ("" if none), and whether it came from the cache
+    """
+    cached = _resolved_urls.get(link)
+    if cached is not None:
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Using cached download URL for {title} from {link}: {cached or 'none'}")
+        return cached, True
+
+    url = _get_download_url(link, title, cancel_flag, countdown_retries, park)
+    if url is None:
+        return "", False
+    if cancel_flag is not None and cancel_flag.is_set():
+        return url, False
+    if url:
+        ttl = min(RESOLVED_URL_CACHE_TTL, _RESOLVED_URL_MAX_TTLS.get(_source_class(link), RESOLVED_URL_CACHE_TTL))
+    else:
+        ttl = RESOLVED_URL_NEGATIVE_TTL
+    if ttl > 0:
+        _resolved_urls.set(link, url, ttl=ttl)
+    return url, False
 
-    return False
 
+def _get_download_url(link: str, title: str, cancel_flag: Optional[Event] = None, max_retries: int = _MAX_COUNTDOWNS, park: bool = False) -> Optional[str]:
+    """Extract actual download URL from various source pages.
 
-def _get_download_url(link: str, title: str, cancel_flag: Optional[Event] = None, max_retries: int = 3) -> str:
-    """Extract actual download URL from various source pages."""
+    Returns:
+        Optional[str]: The download URL, "" if the page holds none, or None if the
+        page could not be fetched or the URL could not be obtained for now
+
+    Raises:
+        DownloadParked: If park is set and the page asks to wait for a long countdown.
+            Its retries_left is the max_retries to resume with once it is over.
+    """
     if logger.isEnabledFor(logging.DEBUG):
         logger.debug(f"Extracting download URL from: {link}")
     url = ""
@@ -655,7 +1350,7 @@ def _get_download_url(link: str, title: str, cancel_flag: Optional[Event] = None
             page = downloader.html_get_page(link)
             if not page:
                 logger.warning(f"Failed to fetch fast download page for {title}")
-                return ""
+                return None
             
             try:
                 response_data = json.loads(page)
@@ -665,15 +1360,15 @@ def _get_download_url(link: str, title: str, cancel_flag: Optional[Event] = None
                     return ""
             except json.JSONDecodeError as e:
                 logger.error(f"Failed to parse fast download JSON response for {title}: {e}")
-                return ""
+                return None
         else:
             html = downloader.html_get_page(link)
 
             if not html or html == "":
                 logger.warning(f"Empty HTML response from {link} for {title}")
-                return ""
+                return None
 
-            soup = BeautifulSoup(html, "html.parser")
+            soup = parse_html(html)
 
             if link.startswith("https://z-lib."):
                 download_link = soup.find_all("a", href=True, class_="addDownloadedBook")
@@ -689,15 +1384,19 @@ def _get_download_url(link: str, title: str, cancel_flag: Optional[Event] = None
                         # Vérifier la limite de tentatives pour éviter la récursion infinie
                         if max_retries <= 0:
                             logger.warning(f"Max retries reached for {title} - giving up")
-                            return ""
+                            return None
                         
                         try:
                             sleep_time = int(countdown[0].text)
+                            if park and sleep_time >= _PARK_MIN_COUNTDOWN:
+                                raise DownloadParked(sleep_time, max_retries - 1)
                             logger.info(f"Waiting {sleep_time}s for {title} (retries left: {max_retries})")
                             if cancel_flag is not None and cancel_flag.wait(timeout=sleep_time):
                                 logger.info(f"Cancelled wait for {title}")
-                                return ""
-                            url = _get_download_url(link, title, cancel_flag, max_retries - 1)
+                                return None
+                            url = _get_download_url(link, title, cancel_flag, max_retries - 1, park)
+                            if url is None:
+                                return None
                         except (ValueError, IndexError) as e:
                             logger.warning(f"Invalid countdown value for {title}: {e}")
                     else:
@@ -719,6 +1418,8 @@ def _get_download_url(link: str, title: str, cancel_flag: Optional[Event] = None
             logger.warning(f"No download URL extracted for {title}")
             return ""
 
+    except DownloadParked:
+        raise
     except Exception as e:
         logger.error(f"Error extracting download URL for {title} from {link}: {e}", exc_info=True)
-        return ""
+        return None
@@ -20,6 +20,7 @@ from selenium.common.exceptions import TimeoutException
 
 import network
 from logger import setup_logger
+from retry import CircuitOpenError, RetryPolicy
 from env import MAX_RETRY, DEFAULT_SLEEP
 from config import PROXIES, CUSTOM_DNS, DOH_SERVER, VIRTUAL_SCREEN_SIZE, RECORDING_DIR
 
@@ -282,7 +283,37 @@ def _get_chromium_args():
 
 CHROMIUM_ARGS = _get_chromium_args()
 
+class _BypassFailedError(requests.exceptions.ConnectionError):
+    """Raised by a bypass attempt that did not get past Cloudflare, so that it is retried."""
+
 def _get(url, retry : int = MAX_RETRY):
+    """Bypass Cloudflare for url, retrying under the retry engine's deadline, budget and circuit breaker.
+
+    LOCKED is only held during each attempt, so the backoff between attempts
+    does not block the other bypasses.
+    """
+    def attempt(attempt_number: int) -> str:
+        global TENTATIVE_CURRENT_URL, LAST_USED
+        with LOCKED:
+            TENTATIVE_CURRENT_URL = url
+            html = _get_attempt(url, attempt_number, retry)
+            LAST_USED = time.time()
+        if html is None:
+            raise _BypassFailedError(f"Failed to bypass Cloudflare for {url}")
+        return html
+
+    base = network.retry_engine.policy
+    policy = RetryPolicy(retry + 1, base.base_delay, base.max_delay, base.deadline)
+    try:
+        return network.retry_engine.run(url, attempt, lambda error: isinstance(error, _BypassFailedError), policy=policy)
+    except CircuitOpenError as e:
+        logger.warning(f"Not bypassing Cloudflare for {url}: {e}")
+    except _BypassFailedError:
+        logger.error(f"Failed to bypass Cloudflare for {url}")
+    return ""
+
+def _get_attempt(url, attempt : int, retry : int) -> Optional[str]:
+    """Run one bypass attempt. Returns the page, or None if it should be retried."""
     try:
         logger.info(f"SB_GET: {url}")
         sb = _get_driver()
@@ -322,13 +353,13 @@ def _get(url, retry : int = MAX_RETRY):
         error_details = f"Exception type: {type(e).__name__}, Message: {str(e)}"
         stack_trace = traceback.format_exc()
         
-        if retry == 0:
+        if attempt > retry:
             logger.error(f"Failed to initialize browser after all retries: {error_details}")
             logger.debug(f"Full stack trace: {stack_trace}")
             _reset_driver()
             raise e
         
-        logger.warning(f"Failed to bypass Cloudflare (retry {MAX_RETRY - retry + 1}/{MAX_RETRY}): {error_details}")
+        logger.warning(f"Failed to bypass Cloudflare (attempt {attempt}/{retry + 1}): {error_details}")
         logger.debug(f"Stack trace: {stack_trace}")
         
         # Reset driver on certain errors
@@ -336,15 +367,10 @@ def _get(url, retry : int = MAX_RETRY):
             logger.info("Resetting driver due to WebDriver error...")
             _reset_driver()
             
-    return _get(url, retry - 1)
+    return None
 
 def get(url, retry : int = MAX_RETRY):
-    global LOCKED, TENTATIVE_CURRENT_URL, LAST_USED
-    with LOCKED:
-        TENTATIVE_CURRENT_URL = url
-        ret = _get(url, retry)
-        LAST_USED = time.time()
-        return ret
+    return _get(url, retry)
 
 def _init_driver():
     global DRIVER
@@ -1,6 +1,6 @@
 from logger import setup_logger
 from typing import Optional
-import requests
+import network
 
 try:
     from env import EXT_BYPASSER_PATH, EXT_BYPASSER_TIMEOUT, EXT_BYPASSER_URL
@@ -28,7 +28,7 @@ def get_bypassed_page(url: str) -> Optional[str]:
         "url": url,
         "maxTimeout": EXT_BYPASSER_TIMEOUT
     }
-    response = requests.post(ext_url, headers=headers, json=data)
+    response = network.session_manager.post(ext_url, headers=headers, json=data)
     response.raise_for_status()
     logger.debug(f"External Bypass response for '{url}': {response.json()['status']} - {response.json()['message']}")
     return response.json()['solution']['response']
@@ -3,16 +3,26 @@
 import network
 network.init()
 import requests
+import urllib3
+import hashlib
+import itertools
+import json
+import os
 import time
-from io import BytesIO
-from typing import Optional
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
 from urllib.parse import urlparse
 from tqdm import tqdm
 from typing import Callable
-from threading import Event
+from threading import Event, Lock
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
 from logger import setup_logger
-from config import PROXIES
-from env import MAX_RETRY, DEFAULT_SLEEP, USE_CF_BYPASS, USING_EXTERNAL_BYPASSER
+from env import MAX_RETRY, DEFAULT_SLEEP, USE_CF_BYPASS, USING_EXTERNAL_BYPASSER, DOWNLOAD_PROGRESS_UPDATE_INTERVAL
+from env import DOWNLOAD_SEGMENTS, DOWNLOAD_SEGMENT_MIN_SIZE, HOST_RATE_LIMIT, HOST_RATE_BURST
+from env import DOWNLOAD_IDLE_TIMEOUT, DOWNLOAD_MIN_SPEED, DOWNLOAD_STALL_WINDOW
+from rate_limit import HostRateLimiter
+from transfer_watchdog import TransferStalledError, TransferWatchdog
+from retry import CircuitOpenError, RetryPolicy
 if USE_CF_BYPASS:
     if USING_EXTERNAL_BYPASSER:
         from cloudflare_bypasser_external import get_bypassed_page
@@ -22,98 +32,569 @@ if USE_CF_BYPASS:
 logger = setup_logger(__name__)
 
 
+class ChecksumMismatchError(Exception):
+    """Raised when a downloaded file does not have the expected MD5."""
+
+
+class UnexpectedContentError(Exception):
+    """Raised when a download turns out not to be a book, e.g. an HTML interstitial page."""
+
+
+# Bytes read before deciding whether a download is the expected file
+SNIFF_SIZE = 4096
+# Offset and signature of the first bytes of the book and archive formats a download may be.
+# Any of them is accepted whatever the expected format: comic archives are often
+# the other container type, and old mobi files are plain PalmDoc.
+_BOOK_SIGNATURES: List[Tuple[int, bytes]] = [
+    (0, b"PK\x03\x04"),
+    (0, b"%PDF"),
+    (0, b"AT&TFORM"),
+    (0, b"Rar!\x1a\x07"),
+    (0, b"7z\xbc\xaf\x27\x1c"),
+    (0, b"TPZ"),
+    (60, b"BOOKMOBI"),
+    (60, b"TEXtREAd"),
+]
+# Formats that are binary files, whose downloads must start with one of _BOOK_SIGNATURES
+_BINARY_FORMATS = {"epub", "cbz", "cbr", "pdf", "djvu", "mobi", "azw3", "azw"}
+
+# Bounds of the adaptive read size used by download_url
+MIN_CHUNK_SIZE = 16 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+# Segments are not split once what is left of them is smaller than this
+MIN_STOLEN_SIZE = 128 * 1024
+# Reads taking less than this grow the chunk size, reads taking more than twice as long shrink it
+TARGET_READ_TIME = 0.1
+
+# Downloads can take much longer than page fetches, so their retries have no deadline
+_download_retry_policy = RetryPolicy(MAX_RETRY + 1, DEFAULT_SLEEP, network.retry_engine.policy.max_delay)
+
+transfer_watchdog = TransferWatchdog(DOWNLOAD_IDLE_TIMEOUT, DOWNLOAD_MIN_SPEED * 1024, DOWNLOAD_STALL_WINDOW)
+
+# Page fetches are spread out per host, requests to different hosts never wait on each other
+_host_rate_limiter = HostRateLimiter(rate=HOST_RATE_LIMIT, burst=HOST_RATE_BURST)
+
+
 def html_get_page(url: str, retry: int = MAX_RETRY, use_bypasser: bool = False) -> str:
     """Fetch HTML content from a URL with retry mechanism.
     
+    Retries back off exponentially, within the shared retry budget, and fail
+    fast while the host's circuit breaker is open.
+    
     Args:
         url: Target URL
         retry: Number of retry attempts
-        skip_404: Whether to skip 404 errors
+        use_bypasser: Fetch the page through the Cloudflare bypasser
         
     Returns:
         str: HTML content if successful, None otherwise
     """
-    response = None
-    try:
-        logger.debug(f"html_get_page: {url}, retry: {retry}, use_bypasser: {use_bypasser}")
-        if use_bypasser and USE_CF_BYPASS:
+    bypass = {"enabled": use_bypasser}
+
+    def attempt(attempt_number: int) -> str:
+        logger.debug(f"html_get_page: {url}, attempt: {attempt_number}, use_bypasser: {bypass['enabled']}")
+        if bypass["enabled"] and USE_CF_BYPASS:
+            logger.info(f"GET Using Cloudflare Bypasser for: {url}")
+            return get_bypassed_page(url)
+
+        logger.info(f"GET: {url}")
+        delay = _host_rate_limiter.acquire(url)
+        if delay > 0:
+            logger.debug(f"Rate limited GET {url} by {delay:.2f} seconds")
+        response = network.session_manager.get(url)
+        if response.status_code == 404:
+            logger.warning(f"404 error for URL: {url}")
+            return ""
+        if response.status_code == 403 and USE_CF_BYPASS:
+            # Switch to the bypasser within this attempt: no backoff and no retry budget spent
+            logger.warning(f"403 detected for URL: {url}. Retrying using cloudflare bypass.")
+            bypass["enabled"] = True
             logger.info(f"GET Using Cloudflare Bypasser for: {url}")
             return get_bypassed_page(url)
-        else:
-            logger.info(f"GET: {url}")
-            response = requests.get(url, proxies=PROXIES)
-            response.raise_for_status()
-            logger.debug(f"Success getting: {url}")
-            time.sleep(1)
+        response.raise_for_status()
+        logger.debug(f"Success getting: {url}")
         return str(response.text)
-        
+
+    policy = None
+    if retry != MAX_RETRY:
+        base = network.retry_engine.policy
+        policy = RetryPolicy(retry + 1, base.base_delay, base.max_delay, base.deadline)
+    try:
+        return network.retry_engine.run(url, attempt, policy=policy)
+    except CircuitOpenError as e:
+        logger.warning(f"Failed to fetch page: {url}, {e}")
+        return ""
     except Exception as e:
-        if retry == 0:
-            logger.error_trace(f"Failed to fetch page: {url}, error: {e}")
-            return ""
-        
-        if use_bypasser and USE_CF_BYPASS:
+        if bypass["enabled"] and USE_CF_BYPASS:
             logger.warning(f"Exception while using cloudflare bypass for URL: {url}")
-            logger.warning(f"Exception: {e}")
-            logger.warning(f"Response: {response}")
-        elif response is not None and response.status_code == 404:
-            logger.warning(f"404 error for URL: {url}")
-            return ""
-        elif response is not None and response.status_code == 403:
-            logger.warning(f"403 detected for URL: {url}. Should retry using cloudflare bypass.")
-            return html_get_page(url, retry - 1, True)
-            
-        sleep_time = DEFAULT_SLEEP * (MAX_RETRY - retry + 1)
-        logger.warning(
-            f"Retrying GET {url} in {sleep_time} seconds due to error: {e}"
-        )
-        time.sleep(sleep_time)
-        return html_get_page(url, retry - 1, use_bypasser)
-
-def download_url(link: str, size: str = "", progress_callback: Optional[Callable[[float], None]] = None, cancel_flag: Optional[Event] = None) -> Optional[BytesIO]:
-    """Download content from URL into a BytesIO buffer.
+        logger.error_trace(f"Failed to fetch page: {url}, error: {e}")
+        return ""
+
+def download_url(link: str, book_path: Path, size: str = "", progress_callback: Optional[Callable[[float], None]] = None, cancel_flag: Optional[Event] = None, expected_md5: Optional[str] = None, expected_format: Optional[str] = None, stats: Optional["TransferStats"] = None) -> bool:
+    """Download content from URL straight to a file.
+    
+    Chunks are written to a ".part" file next to book_path as they arrive, and the
+    file is renamed to book_path once complete, so memory use does not depend on
+    the size of the book and book_path never holds a partial download.
+    
+    A ".part.json" sidecar records the source URL, its ETag/Last-Modified and the
+    bytes received, so an interrupted transfer (or one left over by a restart)
+    is resumed with a Range request instead of starting over.
     
     Args:
         link: URL to download from
+        book_path: Destination file
+        size: Expected size as displayed by AA (e.g. "1.5MB"), used for progress
+        progress_callback: Called with the progress percentage
+        cancel_flag: Stops the download when set
+        expected_md5: MD5 the file must have, computed while the chunks are written
+        expected_format: Book format (e.g. "epub"), checked against the first bytes received
+        stats: Updated with the bytes received, for callers watching the transfer rate
         
     Returns:
-        BytesIO: Buffer containing downloaded content if successful
+        bool: True if the file was downloaded successfully
+        
+    Raises:
+        ChecksumMismatchError: If the downloaded file does not match expected_md5
+        UnexpectedContentError: If the response is not a book, e.g. an HTML page
+        TransferStalledError: If the transfer stalled, in which case another source should be tried
     """
+    part_path = book_path.with_name(book_path.name + ".part")
+    state_path = book_path.with_name(book_path.name + ".part.json")
+    received_before = {"bytes": 0}
+
+    def attempt(attempt_number: int) -> bool:
+        state = _load_partial_state(part_path, state_path, link)
+        received_before["bytes"] = state.get("received", 0)
+        return _download_to_part(link, book_path, part_path, state_path, state, size, progress_callback, cancel_flag, expected_md5, expected_format, stats)
+
+    def should_retry(error: Exception) -> bool:
+        # Only retry transfers that made progress: those are worth resuming
+        if not isinstance(error, (requests.exceptions.RequestException, urllib3.exceptions.HTTPError)):
+            return False
+        # A stalled source is left for the next one
+        if isinstance(error, TransferStalledError):
+            return False
+        return _load_partial_state(part_path, state_path, link).get("received", 0) > received_before["bytes"]
+
     try:
         logger.info(f"Downloading from: {link}")
-        response = requests.get(link, stream=True, proxies=PROXIES)
+        return network.retry_engine.run(link, attempt, should_retry, policy=_download_retry_policy, cancel_flag=cancel_flag)
+    except CircuitOpenError as e:
+        logger.warning(f"Skipping download from {link}: {e}")
+        return False
+    except TransferStalledError:
+        if cancel_flag is not None and cancel_flag.is_set():
+            _discard_partial(part_path, state_path)
+            return False
+        raise
+    except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+        if cancel_flag is not None and cancel_flag.is_set():
+            logger.info(f"Download cancelled: {link}")
+            _discard_partial(part_path, state_path)
+            return False
+        logger.error_trace(f"Failed to download from {link}: {e}")
+        return False
+
+def _download_to_part(link: str, book_path: Path, part_path: Path, state_path: Path, state: Dict[str, Any], size: str, progress_callback: Optional[Callable[[float], None]], cancel_flag: Optional[Event], expected_md5: Optional[str], expected_format: Optional[str], stats: Optional["TransferStats"]) -> bool:
+    """Run one transfer of link into part_path, resuming from state if possible."""
+    offset = state.get("received", 0)
+    headers = {}
+    if offset:
+        # The partial file holds decoded bytes, so the range must be of the unencoded file
+        headers["Range"] = f"bytes={offset}-"
+        headers["Accept-Encoding"] = "identity"
+        validator = state.get("etag") or state.get("last_modified")
+        if validator:
+            headers["If-Range"] = validator
+
+    with transfer_watchdog.watch(link) as watch, network.session_manager.get(link, stream=True, headers=headers, timeout=transfer_watchdog.read_timeout) as response:
+        watch.attach(response)
+        if offset and response.status_code == 416:
+            logger.info(f"Partial download does not match the server copy anymore, restarting: {link}")
+            _discard_partial(part_path, state_path)
+            return _download_to_part(link, book_path, part_path, state_path, {}, size, progress_callback, cancel_flag, expected_md5, expected_format, stats)
         response.raise_for_status()
+        if offset and response.status_code == 206 and response.headers.get("Content-Encoding", "identity").lower() != "identity":
+            logger.info(f"Server sent an encoded range, which does not match the partial download, restarting: {link}")
+            transfer_watchdog.unwatch(watch)
+            response.close()
+            _discard_partial(part_path, state_path)
+            return _download_to_part(link, book_path, part_path, state_path, {}, size, progress_callback, cancel_flag, expected_md5, expected_format, stats)
+        if offset and response.status_code != 206:
+            logger.info(f"Server ignored the range request, restarting from scratch: {link}")
+            offset = 0
+        elif offset:
+            logger.info(f"Resuming download at {offset} bytes: {link}")
+
+        # Reject interstitial pages and wrong files from the first few KB instead of after the whole body
+        head = b"" if offset else response.raw.read(SNIFF_SIZE, decode_content=True)
+        problem = _sniff_content(head, response.headers.get("content-type", ""), expected_format, check_magic=not offset)
+        if problem is not None:
+            if not offset:
+                _discard_partial(part_path, state_path)
+            raise UnexpectedContentError(f"Aborted download from {link}: {problem}")
+
+        content_length = _segmentable_length(response) if not offset else None
+        if content_length is not None:
+            # Each segment request is watched on its own
+            transfer_watchdog.unwatch(watch)
+            response.close()
+            return _download_segmented(link, book_path, part_path, state_path, content_length, progress_callback, cancel_flag, expected_md5, stats)
 
         total_size : float = 0.0
         try:
             # we assume size is in MB
             total_size = float(size.strip().replace(" ", "").replace(",", ".").upper()[:-2].strip()) * 1024 * 1024
         except:
-            total_size = float(response.headers.get('content-length', 0))
-        
-        buffer = BytesIO()
+            total_size = offset + float(response.headers.get('content-length', 0))
+
+        state = {
+            "url": link,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "received": offset,
+        }
+        _save_partial_state(state_path, state)
 
         # Initialize the progress bar with your guess
-        pbar = tqdm(total=total_size, unit='B', unit_scale=True, desc='Downloading')
-        for chunk in response.iter_content(chunk_size=1000):
-            buffer.write(chunk)
-            pbar.update(len(chunk))
-            if progress_callback is not None:
-                progress_callback(pbar.n * 100.0 / total_size)
-            if cancel_flag is not None and cancel_flag.is_set():
-                logger.info(f"Download cancelled: {link}")
-                return None
-            
+        pbar = tqdm(total=total_size, initial=offset, unit='B', unit_scale=True, desc='Downloading')
+        last_progress_time = time.monotonic()
+        cancelled = False
+        digest = hashlib.md5()
+        with open(part_path, "r+b" if offset else "wb") as f:
+            if offset:
+                # Only the resumed prefix is read back, the rest is hashed as it arrives
+                _hash_file_prefix(f, offset, digest)
+            f.seek(offset)
+            f.truncate()
+            try:
+                for chunk in itertools.chain([head] if head else [], _iter_adaptive_chunks(response)):
+                    f.write(chunk)
+                    digest.update(chunk)
+                    watch.record(len(chunk))
+                    if stats is not None:
+                        stats.record(len(chunk))
+                    pbar.update(len(chunk))
+                    if cancel_flag is not None and cancel_flag.is_set():
+                        logger.info(f"Download cancelled: {link}")
+                        cancelled = True
+                        break
+                    # Publishing progress takes the queue lock, so only do it every DOWNLOAD_PROGRESS_UPDATE_INTERVAL
+                    now = time.monotonic()
+                    if now - last_progress_time >= DOWNLOAD_PROGRESS_UPDATE_INTERVAL:
+                        if progress_callback is not None and total_size:
+                            progress_callback(pbar.n * 100.0 / total_size)
+                        f.flush()
+                        state["received"] = f.tell()
+                        _save_partial_state(state_path, state)
+                        last_progress_time = now
+                watch.raise_if_stalled()
+            finally:
+                state["received"] = f.tell()
+                _save_partial_state(state_path, state)
+
         pbar.close()
-        if buffer.tell() * 0.1 < total_size * 0.9:
-            # Check the content of the buffer if its HTML or binary
-            if response.headers.get('content-type', '').startswith('text/html'):
-                logger.warn(f"Failed to download content for {link}. Found HTML content instead.")
-                return None
-        return buffer
-    except requests.exceptions.RequestException as e:
-        logger.error_trace(f"Failed to download from {link}: {e}")
+        if cancelled:
+            _discard_partial(part_path, state_path)
+            return False
+        if progress_callback is not None and total_size:
+            progress_callback(pbar.n * 100.0 / total_size)
+
+    _check_md5(digest, expected_md5, link, part_path, state_path)
+    os.replace(part_path, book_path)
+    state_path.unlink(missing_ok=True)
+    return True
+
+def _sniff_content(head: bytes, content_type: str, expected_format: Optional[str], check_magic: bool = True) -> Optional[str]:
+    """Check the headers and first bytes of a download.
+
+    HTML pages are always rejected. Files expected in a binary format are also
+    rejected if they are served as text or do not start like any known book or
+    archive format.
+
+    Args:
+        head: First bytes of the body (empty when resuming)
+        content_type: Content-Type header of the response
+        expected_format: Book format (e.g. "epub"), or None if unknown
+        check_magic: Whether head is the start of the file, to check against the known formats (False when resuming)
+
+    Returns:
+        A description of the problem, or None if the content looks right
+    """
+    content_type = content_type.lower()
+    if content_type.startswith("text/html") or _looks_like_html(head):
+        return f"got an HTML page instead of the {expected_format or 'book'} file"
+    if (expected_format or "").lower() not in _BINARY_FORMATS:
+        return None
+    if content_type.startswith("text/"):
+        return f"got {content_type} content instead of the {expected_format} file"
+    if not check_magic:
+        return None
+    if any(head[offset:offset + len(signature)] == signature for offset, signature in _BOOK_SIGNATURES):
+        return None
+    return "first bytes do not match any known book format"
+
+def _looks_like_html(head: bytes) -> bool:
+    start = head.lstrip(b"\xef\xbb\xbf \t\r\n")[:64].lower()
+    return start.startswith(b"<!doctype html") or start.startswith(b"<html")
+
+def _hash_file_prefix(f: BinaryIO, length: int, digest: Any) -> None:
+    f.seek(0)
+    remaining = length
+    while remaining > 0:
+        data = f.read(min(remaining, MAX_CHUNK_SIZE))
+        if not data:
+            break
+        digest.update(data)
+        remaining -= len(data)
+
+def _check_md5(digest: Any, expected_md5: Optional[str], link: str, part_path: Path, state_path: Path) -> None:
+    """Discard the download and raise ChecksumMismatchError if digest does not match expected_md5."""
+    if expected_md5 is None:
+        return
+    actual = digest.hexdigest()
+    if actual != expected_md5.lower():
+        _discard_partial(part_path, state_path)
+        raise ChecksumMismatchError(f"MD5 mismatch for {link}: expected {expected_md5.lower()}, got {actual}")
+    logger.info(f"MD5 verified: {actual}")
+
+class TransferStats:
+    """Bytes received by a transfer, updated by download_url as chunks arrive."""
+
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self.first_byte_at: Optional[float] = None
+        self.received = 0
+        self._lock = Lock()
+
+    def record(self, size: int) -> None:
+        with self._lock:
+            if self.first_byte_at is None and size > 0:
+                self.first_byte_at = time.monotonic()
+            self.received += size
+
+    def throughput(self) -> float:
+        """Average bytes per second since the first byte, 0 if none arrived yet."""
+        if self.first_byte_at is None:
+            return 0.0
+        elapsed = time.monotonic() - self.first_byte_at
+        return self.received / elapsed if elapsed > 0 else 0.0
+
+class _Segment:
+    """A byte range [position, end) of a segmented download still to be fetched."""
+
+    def __init__(self, position: int, end: int) -> None:
+        self.position = position
+        self.end = end
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.position
+
+def _segmentable_length(response: requests.Response) -> Optional[int]:
+    """Return the size of the response body if it should be fetched in segments, else None."""
+    if DOWNLOAD_SEGMENTS <= 1 or response.status_code != 200:
+        return None
+    if "bytes" not in response.headers.get("Accept-Ranges", "").lower():
+        return None
+    if response.headers.get("content-type", "").startswith("text/html"):
+        return None
+    # Ranges apply to the encoded body, which raw reads would decode
+    if response.headers.get("Content-Encoding", "identity").lower() != "identity":
+        return None
+    try:
+        length = int(response.headers.get("Content-Length", ""))
+    except ValueError:
         return None
+    return length if length >= DOWNLOAD_SEGMENT_MIN_SIZE * 1024 * 1024 else None
+
+def _download_segmented(link: str, book_path: Path, part_path: Path, state_path: Path, length: int, progress_callback: Optional[Callable[[float], None]], cancel_flag: Optional[Event], expected_md5: Optional[str], stats: Optional["TransferStats"]) -> bool:
+    """Download link over DOWNLOAD_SEGMENTS concurrent range requests into a preallocated file.
+    
+    Each worker writes its range at its offset. A worker that finishes early
+    takes over the second half of the largest remaining range, so a slow
+    connection does not hold up the whole download.
+    """
+    segment_size = -(-length // DOWNLOAD_SEGMENTS)
+    segments = [_Segment(start, min(start + segment_size, length)) for start in range(0, length, segment_size)]
+    lock = Lock()
+    stop = Event()
+    logger.info(f"Downloading {length} bytes in {len(segments)} segments: {link}")
+
+    # Segmented downloads are not contiguous, so they cannot be resumed from the sidecar
+    _discard_partial(part_path, state_path)
+    with open(part_path, "wb") as f:
+        f.truncate(length)
+        if hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(f.fileno(), 0, length)
+            except OSError:
+                pass
+
+    pbar = tqdm(total=length, unit='B', unit_scale=True, desc='Downloading')
+    try:
+        with ThreadPoolExecutor(max_workers=len(segments), thread_name_prefix="BookSegment") as executor:
+            futures = [executor.submit(_download_segment, link, part_path, segment, segments, lock, stop) for segment in segments]
+            done: Set[Future] = set()
+            last_progress_time = time.monotonic()
+            while len(done) < len(futures):
+                finished, _ = wait(futures, timeout=0.5, return_when=FIRST_EXCEPTION)
+                with lock:
+                    received = length - sum(segment.remaining for segment in segments)
+                if stats is not None:
+                    stats.record(received - pbar.n)
+                pbar.update(received - pbar.n)
+                now = time.monotonic()
+                if progress_callback is not None and (now - last_progress_time >= DOWNLOAD_PROGRESS_UPDATE_INTERVAL or len(finished) == len(futures)):
+                    progress_callback(received * 100.0 / length)
+                    last_progress_time = now
+                if cancel_flag is not None and cancel_flag.is_set():
+                    logger.info(f"Download cancelled: {link}")
+                    stop.set()
+                    _discard_partial(part_path, state_path)
+                    return False
+                for future in finished:
+                    if future.exception() is not None:
+                        stop.set()
+                        raise future.exception()
+                done = set(finished)
+    except BaseException:
+        stop.set()
+        _discard_partial(part_path, state_path)
+        raise
+    finally:
+        pbar.close()
+
+    if expected_md5 is not None:
+        # Segments arrive out of order, so the file is hashed once complete
+        digest = hashlib.md5()
+        with open(part_path, "rb") as f:
+            _hash_file_prefix(f, length, digest)
+        _check_md5(digest, expected_md5, link, part_path, state_path)
+    os.replace(part_path, book_path)
+    return True
+
+def _download_segment(link: str, part_path: Path, segment: _Segment, segments: List[_Segment], lock: Lock, stop: Event) -> None:
+    """Fetch a segment, then keep stealing work from the slowest ones until none is left."""
+    with open(part_path, "r+b") as f:
+        while segment is not None and not stop.is_set():
+            retry = MAX_RETRY
+            while segment.remaining > 0 and not stop.is_set():
+                position = segment.position
+                error: Optional[Exception] = None
+                try:
+                    _fetch_segment_range(link, f, segment, lock, stop)
+                except TransferStalledError:
+                    raise
+                except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError) as e:
+                    error = e
+                if segment.remaining <= 0 or stop.is_set():
+                    break
+                # A response that ended early is only free if it brought some data
+                if error is None and segment.position > position:
+                    continue
+                if retry == 0:
+                    if error is not None:
+                        raise error
+                    raise requests.exceptions.ConnectionError(f"Segment at {segment.position} keeps ending without data")
+                retry -= 1
+                delay = _download_retry_policy.backoff(MAX_RETRY - retry)
+                logger.warning(f"Segment at {segment.position} interrupted, retrying in {delay:.1f} seconds: {error or 'no data received'}")
+                stop.wait(delay)
+            segment = _steal_segment(segments, lock)
+
+def _fetch_segment_range(link: str, f: BinaryIO, segment: _Segment, lock: Lock, stop: Event) -> None:
+    headers = {"Range": f"bytes={segment.position}-{segment.end - 1}"}
+    with transfer_watchdog.watch(link) as watch, network.session_manager.get(link, stream=True, headers=headers, timeout=transfer_watchdog.read_timeout) as response:
+        watch.attach(response)
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise requests.exceptions.HTTPError(f"Server did not honor range request ({response.status_code})", response=response)
+        for chunk in _iter_adaptive_chunks(response):
+            if stop.is_set():
+                return
+            with lock:
+                # The end moves back when another worker takes over part of this segment
+                chunk = chunk[:segment.remaining]
+                position = segment.position
+                segment.position += len(chunk)
+            f.seek(position)
+            f.write(chunk)
+            watch.record(len(chunk))
+            if segment.remaining <= 0:
+                return
+        watch.raise_if_stalled()
+
+def _steal_segment(segments: List[_Segment], lock: Lock) -> Optional[_Segment]:
+    """Split the largest remaining segment in two and return its second half, if worth it."""
+    with lock:
+        largest = max(segments, key=lambda segment: segment.remaining)
+        if largest.remaining < MIN_STOLEN_SIZE:
+            return None
+        middle = largest.position + largest.remaining // 2
+        stolen = _Segment(middle, largest.end)
+        largest.end = middle
+        segments.append(stolen)
+        return stolen
+
+def _load_partial_state(part_path: Path, state_path: Path, link: str) -> Dict[str, Any]:
+    """Return the sidecar of a partial download that can be resumed from link, or {}.
+    
+    The partial file can be resumed from the exact same URL, or from a URL to the
+    same path on the same host (mirrors often add expiring tokens to the query)
+    as long as a validator was recorded to check that the content did not change.
+    """
+    try:
+        state = json.loads(state_path.read_text())
+        # The sidecar may be ahead of the data if the process was killed
+        state["received"] = min(int(state["received"]), part_path.stat().st_size)
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+    source = urlparse(state.get("url", ""))
+    target = urlparse(link)
+    same_resource = (source.netloc, source.path) == (target.netloc, target.path)
+    if state.get("url") != link and not (same_resource and (state.get("etag") or state.get("last_modified"))):
+        return {}
+    return state
+
+def _save_partial_state(state_path: Path, state: Dict[str, Any]) -> None:
+    tmp_path = state_path.with_name(state_path.name + ".tmp")
+    tmp_path.write_text(json.dumps(state))
+    os.replace(tmp_path, state_path)
+
+def _discard_partial(part_path: Path, state_path: Path) -> None:
+    part_path.unlink(missing_ok=True)
+    state_path.unlink(missing_ok=True)
+
+def discard_partial_download(book_path: Path) -> None:
+    """Delete the partial files download_url keeps for resuming a download to book_path."""
+    _discard_partial(book_path.with_name(book_path.name + ".part"), book_path.with_name(book_path.name + ".part.json"))
+
+def _iter_adaptive_chunks(response: requests.Response) -> Iterator[bytes]:
+    """Read a streamed response in chunks sized after the observed throughput.
+
+    Each read returns the data already available, up to the chunk size, rather
+    than waiting for a full chunk. The chunk size doubles while reads fill it
+    faster than TARGET_READ_TIME and halves when they get much slower, between
+    MIN_CHUNK_SIZE and MAX_CHUNK_SIZE. Fast transfers then take few loop
+    iterations per MB, while slow ones still yield (and so report progress,
+    feed the watchdog and check for cancellation) as soon as data arrives.
+    """
+    # urllib3 < 2 has no read1, its read waits for the whole chunk
+    read = getattr(response.raw, "read1", response.raw.read)
+    chunk_size = MIN_CHUNK_SIZE
+    while True:
+        start = time.monotonic()
+        chunk = read(chunk_size, decode_content=True)
+        elapsed = time.monotonic() - start
+        if not chunk:
+            return
+        yield chunk
+        if elapsed < TARGET_READ_TIME and len(chunk) == chunk_size:
+            chunk_size = min(chunk_size * 2, MAX_CHUNK_SIZE)
+        elif elapsed > TARGET_READ_TIME * 2:
+            chunk_size = max(chunk_size // 2, MIN_CHUNK_SIZE)
 
 def get_absolute_url(base_url: str, url: str) -> str:
     """Get absolute URL from relative URL and base URL.
@@ -101,6 +101,7 @@ change_ownership() {
 change_ownership /app
 change_ownership /var/log/cwa-book-downloader
 change_ownership /tmp/cwa-book-downloader
+change_ownership ${CACHE_DIR:-/var/cache/cwa-book-downloader}
 
 # Test write to all folders
 make_writable /cwa-book-ingest
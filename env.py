@@ -41,13 +41,46 @@ if DEBUG:
 else:
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
 ENABLE_LOGGING = string_to_bool(os.getenv("ENABLE_LOGGING", "true"))
-MAIN_LOOP_SLEEP_TIME = int(os.getenv("MAIN_LOOP_SLEEP_TIME", "5"))
 MAX_CONCURRENT_DOWNLOADS = int(os.getenv("MAX_CONCURRENT_DOWNLOADS", "3"))
 DOWNLOAD_PROGRESS_UPDATE_INTERVAL = int(os.getenv("DOWNLOAD_PROGRESS_UPDATE_INTERVAL", "5"))
 DOCKERMODE = string_to_bool(os.getenv("DOCKERMODE", "false"))
 _CUSTOM_DNS = os.getenv("CUSTOM_DNS", "").strip()
 USE_DOH = string_to_bool(os.getenv("USE_DOH", "false"))
 BYPASS_RELEASE_INACTIVE_MIN = int(os.getenv("BYPASS_RELEASE_INACTIVE_MIN", "5"))
+SEARCH_CACHE_TTL = int(os.getenv("SEARCH_CACHE_TTL", "300"))
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "128"))
+HTML_PARSER = os.getenv("HTML_PARSER", "auto").strip().lower()
+SEARCH_PARTIAL_PARSE = string_to_bool(os.getenv("SEARCH_PARTIAL_PARSE", "true"))
+SEARCH_MAX_PAGES = int(os.getenv("SEARCH_MAX_PAGES", "5"))
+SEARCH_PAGE_WORKERS = int(os.getenv("SEARCH_PAGE_WORKERS", "3"))
+CACHE_DIR = Path(os.getenv("CACHE_DIR", "/var/cache/cwa-book-downloader"))
+BOOK_INFO_CACHE_SIZE = int(os.getenv("BOOK_INFO_CACHE_SIZE", "5000"))
+BOOK_INFO_METADATA_TTL = int(os.getenv("BOOK_INFO_METADATA_TTL", str(7 * 24 * 3600)))
+BOOK_INFO_LINKS_TTL = int(os.getenv("BOOK_INFO_LINKS_TTL", str(6 * 3600)))
+WELIB_TIMEOUT = int(os.getenv("WELIB_TIMEOUT", "90"))
+METADATA_RESOLVER_WORKERS = int(os.getenv("METADATA_RESOLVER_WORKERS", "4"))
+DOWNLOAD_SEGMENTS = int(os.getenv("DOWNLOAD_SEGMENTS", "1"))
+DOWNLOAD_SEGMENT_MIN_SIZE = int(os.getenv("DOWNLOAD_SEGMENT_MIN_SIZE", "20"))
+HOST_RATE_LIMIT = float(os.getenv("HOST_RATE_LIMIT", "1"))
+HOST_RATE_BURST = int(os.getenv("HOST_RATE_BURST", "5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "60"))
+RETRY_DEADLINE = float(os.getenv("RETRY_DEADLINE", "120"))
+RETRY_BUDGET_RATIO = float(os.getenv("RETRY_BUDGET_RATIO", "0.2"))
+RETRY_BUDGET_MAX = int(os.getenv("RETRY_BUDGET_MAX", "20"))
+CIRCUIT_BREAKER_THRESHOLD = int(os.getenv("CIRCUIT_BREAKER_THRESHOLD", "5"))
+CIRCUIT_BREAKER_RESET = float(os.getenv("CIRCUIT_BREAKER_RESET", "60"))
+VERIFY_MD5 = string_to_bool(os.getenv("VERIFY_MD5", "true"))
+HEDGE_DOWNLOADS = string_to_bool(os.getenv("HEDGE_DOWNLOADS", "false"))
+HEDGE_FIRST_BYTE_TIMEOUT = float(os.getenv("HEDGE_FIRST_BYTE_TIMEOUT", "30"))
+HEDGE_MIN_SPEED = float(os.getenv("HEDGE_MIN_SPEED", "100"))
+DOWNLOAD_IDLE_TIMEOUT = float(os.getenv("DOWNLOAD_IDLE_TIMEOUT", "60"))
+DOWNLOAD_MIN_SPEED = float(os.getenv("DOWNLOAD_MIN_SPEED", "1"))
+DOWNLOAD_STALL_WINDOW = float(os.getenv("DOWNLOAD_STALL_WINDOW", "120"))
+ADAPTIVE_SOURCE_ORDER = string_to_bool(os.getenv("ADAPTIVE_SOURCE_ORDER", "true"))
+SOURCE_EXPLORATION_RATE = float(os.getenv("SOURCE_EXPLORATION_RATE", "0.1"))
+PARK_COUNTDOWNS = string_to_bool(os.getenv("PARK_COUNTDOWNS", "true"))
+RESOLVED_URL_CACHE_TTL = int(os.getenv("RESOLVED_URL_CACHE_TTL", "600"))
+RESOLVED_URL_NEGATIVE_TTL = int(os.getenv("RESOLVED_URL_NEGATIVE_TTL", "60"))
 
 # Logging settings
 LOG_FILE = LOG_DIR / "cwa-book-downloader.log"
@@ -0,0 +1,127 @@
+"""HTML parsing helpers with a pluggable BeautifulSoup backend."""
+
+import re
+from typing import Iterable, Iterator, List, Optional
+from bs4 import BeautifulSoup, FeatureNotFound, SoupStrainer, Tag
+
+from logger import setup_logger
+from env import HTML_PARSER
+
+logger = setup_logger(__name__)
+
+# Backends tried in order when HTML_PARSER is "auto", fastest first.
+# "html.parser" ships with Python and is always available as the last resort.
+PREFERRED_BACKENDS: List[str] = ["lxml", "html.parser"]
+
+
+def is_backend_available(backend: str) -> bool:
+    """Check whether BeautifulSoup can use the given tree builder."""
+    if backend == "html.parser":
+        return True
+    try:
+        BeautifulSoup("", backend)
+        return True
+    except FeatureNotFound:
+        return False
+
+
+def available_backends() -> List[str]:
+    """List the installed backends, in order of preference."""
+    return [backend for backend in PREFERRED_BACKENDS if is_backend_available(backend)]
+
+
+def _select_backend(requested: str) -> str:
+    """Resolve the configured backend name, falling back to html.parser."""
+    requested = requested.strip().lower()
+    if requested and requested != "auto":
+        if is_backend_available(requested):
+            return requested
+        logger.warning(f"HTML_PARSER '{requested}' is not available, falling back to automatic selection")
+    return available_backends()[0]
+
+
+PARSER_BACKEND = _select_backend(HTML_PARSER)
+logger.info(f"HTML parser backend: {PARSER_BACKEND}")
+
+
+def parse_html(html: str, parse_only: Optional[SoupStrainer] = None, backend: Optional[str] = None) -> BeautifulSoup:
+    """Parse an HTML document with the configured backend.
+
+    Args:
+        html: Raw HTML content
+        parse_only: Optional SoupStrainer restricting which elements are built into the tree
+        backend: Override the configured backend (mainly for benchmarking)
+
+    Returns:
+        BeautifulSoup: Parsed document
+    """
+    return BeautifulSoup(html, backend or PARSER_BACKEND, parse_only=parse_only)
+
+
+class RowStrainer(SoupStrainer):
+    """Only build top-level <tr> elements, skipping rows carrying any of the given classes."""
+
+    def __init__(self, skip_classes: Iterable[str] = ()) -> None:
+        super().__init__("tr")
+        self.skip_classes = frozenset(skip_classes)
+
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        if not super().allow_tag_creation(nsprefix, name, attrs):
+            return False
+        classes = (attrs or {}).get("class") or []
+        if isinstance(classes, str):
+            classes = classes.split()
+        return self.skip_classes.isdisjoint(classes)
+
+
+def _first_table(html: str) -> Optional[str]:
+    """Slice the markup of the first <table> out of a document, without tokenizing it."""
+    start = html.find("<table")
+    if start == -1:
+        return None
+    end = html.find("</table>", start)
+    return html[start:] if end == -1 else html[start:end + len("</table>")]
+
+
+def parse_table_rows(html: str, skip_classes: Iterable[str] = (), backend: Optional[str] = None) -> Optional[List[Tag]]:
+    """Parse only the rows of the first <table> in a document.
+
+    The markup before and after the table (navigation, scripts...) is sliced off
+    without being tokenized, and rows carrying one of skip_classes are never
+    turned into tags.
+
+    Returns:
+        The parsed rows, or None if the document has no table
+    """
+    fragment = _first_table(html)
+    if fragment is None:
+        return None
+    soup = parse_html(fragment, parse_only=RowStrainer(skip_classes), backend=backend)
+    return soup.find_all("tr", recursive=False)
+
+
+_ROW_START = re.compile(r"<tr[\s>]", re.IGNORECASE)
+
+
+def iter_table_rows(html: str, skip_classes: Iterable[str] = (), backend: Optional[str] = None) -> Optional[Iterator[Tag]]:
+    """Lazily parse the rows of the first <table> in a document, one row at a time.
+
+    Like parse_table_rows, but each row is only parsed when the iterator reaches
+    it, so callers can act on the first rows before the rest of the table is parsed.
+
+    Returns:
+        An iterator over the parsed rows, or None if the document has no table
+    """
+    fragment = _first_table(html)
+    if fragment is None:
+        return None
+    return _iter_row_chunks(fragment, RowStrainer(skip_classes), backend)
+
+
+def _iter_row_chunks(fragment: str, strainer: RowStrainer, backend: Optional[str]) -> Iterator[Tag]:
+    starts = [match.start() for match in _ROW_START.finditer(fragment)]
+    for i, start in enumerate(starts):
+        end = starts[i + 1] if i + 1 < len(starts) else len(fragment)
+        # Rows are wrapped back in a table so that every backend keeps them
+        soup = parse_html(f"<table>{fragment[start:end]}</table>", parse_only=strainer, backend=backend)
+        yield from soup.find_all("tr", recursive=False)
@@ -4,7 +4,7 @@ from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple
 from enum import Enum
 from datetime import datetime, timedelta
-from threading import Lock, Event
+from threading import Condition, Lock, Event
 from pathlib import Path
 import queue
 import time
@@ -12,7 +12,9 @@ from env import INGEST_DIR, STATUS_TIMEOUT
 
 class QueueStatus(str, Enum):
     """Enum for possible book queue statuses."""
+    RESOLVING = "resolving"
     QUEUED = "queued"
+    WAITING = "waiting"
     DOWNLOADING = "downloading"
     AVAILABLE = "available"
     ERROR = "error"
@@ -49,18 +51,25 @@ class BookInfo:
     download_path: Optional[str] = None
     priority: int = 0
     progress: Optional[float] = None
+    md5_verified: Optional[bool] = None
+    stalled_sources: int = 0
 
 class BookQueue:
     """Thread-safe book queue manager with priority support and cancellation."""
     def __init__(self) -> None:
         self._queue: queue.PriorityQueue[QueueItem] = queue.PriorityQueue()
         self._lock = Lock()
+        # Signalled, with _version bumped, whenever there may be something new to dispatch
+        self._changed = Condition(self._lock)
+        self._version = 0
         self._status: dict[str, QueueStatus] = {}
         self._book_data: dict[str, BookInfo] = {}
         self._status_timestamps: dict[str, datetime] = {}  # Track when each status was last updated
         self._status_timeout = timedelta(seconds=STATUS_TIMEOUT)  # 1 hour timeout
         self._cancel_flags: dict[str, Event] = {}  # Cancellation flags for active downloads
         self._active_downloads: dict[str, bool] = {}  # Track currently downloading books
+        self._admitted_times: dict[str, float] = {}  # Admission time of books still resolving
+        self._dispatched_times: dict[str, float] = {}  # Queue time of books taken off the queue, kept to requeue them in place
     
     def add(self, book_id: str, book_data: BookInfo, priority: int = 0) -> None:
         """Add a book to the queue with specified priority.
@@ -80,6 +89,58 @@ class BookQueue:
             self._queue.put(queue_item)
             self._book_data[book_id] = book_data
             self._update_status(book_id, QueueStatus.QUEUED)
+            self._notify()
+    
+    def admit(self, book_id: str, priority: int = 0) -> bool:
+        """Accept a book whose details are not known yet, in the resolving state.
+
+        The book only enters the download queue once resolve() is called with its
+        details. Its place in the queue is still based on its admission time.
+        
+        Args:
+            book_id: Unique identifier for the book
+            priority: Priority level (lower number = higher priority)
+            
+        Returns:
+            bool: True if the book was admitted, False if it is already being handled
+        """
+        with self._lock:
+            if book_id in self._status and self._status[book_id] not in [QueueStatus.ERROR, QueueStatus.DONE, QueueStatus.CANCELLED]:
+                return False
+                
+            self._book_data[book_id] = BookInfo(id=book_id, title=book_id, priority=priority)
+            self._admitted_times[book_id] = time.time()
+            self._update_status(book_id, QueueStatus.RESOLVING)
+            return True
+    
+    def resolve(self, book_id: str, book_data: BookInfo) -> bool:
+        """Queue an admitted book for download now that its details are known.
+        
+        Args:
+            book_id: Unique identifier for the book
+            book_data: Book information
+            
+        Returns:
+            bool: True if the book was queued, False if it was cancelled meanwhile
+        """
+        with self._lock:
+            added_time = self._admitted_times.pop(book_id, None)
+            if self._status.get(book_id) != QueueStatus.RESOLVING or added_time is None:
+                return False
+                
+            book_data.priority = self._book_data[book_id].priority
+            self._queue.put(QueueItem(book_id, book_data.priority, added_time))
+            self._book_data[book_id] = book_data
+            self._update_status(book_id, QueueStatus.QUEUED)
+            self._notify()
+            return True
+    
+    def fail_resolution(self, book_id: str) -> None:
+        """Mark an admitted book as failed because its details could not be resolved."""
+        with self._lock:
+            self._admitted_times.pop(book_id, None)
+            if self._status.get(book_id) == QueueStatus.RESOLVING:
+                self._update_status(book_id, QueueStatus.ERROR)
     
     def get_next(self) -> Optional[Tuple[str, Event]]:
         """Get next book ID from queue with cancellation flag.
@@ -100,11 +161,43 @@ class BookQueue:
                 cancel_flag = Event()
                 self._cancel_flags[book_id] = cancel_flag
                 self._active_downloads[book_id] = True
+                self._dispatched_times[book_id] = queue_item.added_time
                 
             return book_id, cancel_flag
         except queue.Empty:
             return None
             
+    def _notify(self) -> None:
+        """Wake up wait_for_change() callers. Must be called with the lock held."""
+        self._version += 1
+        self._changed.notify_all()
+    
+    def notify(self) -> None:
+        """Signal a change that happened outside the queue, e.g. a download finishing."""
+        with self._lock:
+            self._notify()
+    
+    @property
+    def version(self) -> int:
+        """Counter bumped by every change signalled to wait_for_change() callers."""
+        return self._version
+    
+    def wait_for_change(self, since: int, timeout: Optional[float] = None) -> bool:
+        """Block until a change is signalled after `version` was `since`.
+        
+        Reading `version` before looking at the queue and passing it here means
+        changes made in between are never missed.
+        
+        Args:
+            since: Value of `version` when the caller last looked at the queue
+            timeout: Maximum time to wait in seconds, None to wait indefinitely
+            
+        Returns:
+            bool: True if a change was signalled, False on timeout
+        """
+        with self._lock:
+            return self._changed.wait_for(lambda: self._version != since, timeout)
+    
     def _update_status(self, book_id: str, status: QueueStatus) -> None:
         """Internal method to update status and timestamp."""
         self._status[book_id] = status
@@ -119,6 +212,38 @@ class BookQueue:
             if status in [QueueStatus.AVAILABLE, QueueStatus.ERROR, QueueStatus.DONE, QueueStatus.CANCELLED]:
                 self._active_downloads.pop(book_id, None)
                 self._cancel_flags.pop(book_id, None)
+                self._dispatched_times.pop(book_id, None)
+    
+    def park(self, book_id: str) -> bool:
+        """Move a downloading book to the waiting state, freeing its download slot.
+        
+        The book stays out of the queue until unpark() is called.
+        
+        Returns:
+            bool: True if the book was parked, False if it was cancelled meanwhile
+        """
+        with self._lock:
+            if self._status.get(book_id) != QueueStatus.DOWNLOADING:
+                return False
+            self._active_downloads.pop(book_id, None)
+            self._cancel_flags.pop(book_id, None)
+            self._update_status(book_id, QueueStatus.WAITING)
+            return True
+    
+    def unpark(self, book_id: str) -> bool:
+        """Put a waiting book back in the queue, in its original place.
+        
+        Returns:
+            bool: True if the book was queued, False if it was cancelled meanwhile
+        """
+        with self._lock:
+            if self._status.get(book_id) != QueueStatus.WAITING:
+                return False
+            added_time = self._dispatched_times.pop(book_id, time.time())
+            self._queue.put(QueueItem(book_id, self._book_data[book_id].priority, added_time))
+            self._update_status(book_id, QueueStatus.QUEUED)
+            self._notify()
+            return True
     
     def update_download_path(self, book_id: str, download_path: str) -> None:
         """Update the download path of a book in the queue."""
@@ -169,6 +294,31 @@ class BookQueue:
             # Put items back in queue
             for item in temp_items:
                 self._queue.put(item)
+            
+            # Books still resolving are not in the priority queue yet
+            for book_id, added_time in self._admitted_times.items():
+                book_info = self._book_data[book_id]
+                queue_items.append({
+                    'id': book_id,
+                    'title': book_info.title,
+                    'author': book_info.author,
+                    'priority': book_info.priority,
+                    'added_time': added_time,
+                    'status': QueueStatus.RESOLVING
+                })
+            
+            # Books waiting for a countdown are out of the queue until it ends
+            for book_id, status in self._status.items():
+                if status == QueueStatus.WAITING:
+                    book_info = self._book_data[book_id]
+                    queue_items.append({
+                        'id': book_id,
+                        'title': book_info.title,
+                        'author': book_info.author,
+                        'priority': book_info.priority,
+                        'added_time': self._dispatched_times.get(book_id, 0.0),
+                        'status': QueueStatus.WAITING
+                    })
                 
             return sorted(queue_items, key=lambda x: (x['priority'], x['added_time']))
             
@@ -189,10 +339,24 @@ class BookQueue:
                 if book_id in self._cancel_flags:
                     self._cancel_flags[book_id].set()
                 self._update_status(book_id, QueueStatus.CANCELLED)
+                self._notify()
                 return True
             elif current_status == QueueStatus.QUEUED:
                 # Remove from queue and mark as cancelled
                 self._update_status(book_id, QueueStatus.CANCELLED)
+                self._notify()
+                return True
+            elif current_status == QueueStatus.WAITING:
+                # Out of the queue, unpark() will see the cancellation
+                self._dispatched_times.pop(book_id, None)
+                self._update_status(book_id, QueueStatus.CANCELLED)
+                self._notify()
+                return True
+            elif current_status == QueueStatus.RESOLVING:
+                # Never reaches the queue, resolve() will see the cancellation
+                self._admitted_times.pop(book_id, None)
+                self._update_status(book_id, QueueStatus.CANCELLED)
+                self._notify()
                 return True
             
             return False
@@ -208,6 +372,10 @@ class BookQueue:
             bool: True if priority was successfully changed
         """
         with self._lock:
+            if self._status.get(book_id) in [QueueStatus.RESOLVING, QueueStatus.WAITING]:
+                # Not in the queue, resolve() and unpark() will use the new priority
+                self._book_data[book_id].priority = new_priority
+                return True
             if book_id not in self._status or self._status[book_id] != QueueStatus.QUEUED:
                 return False
                 
@@ -234,7 +402,9 @@ class BookQueue:
             # Put all items back
             for item in temp_items:
                 self._queue.put(item)
-                
+            
+            if found:
+                self._notify()
             return found
             
     def reorder_queue(self, book_priorities: Dict[str, int]) -> bool:
@@ -266,7 +436,8 @@ class BookQueue:
             # Put all items back with updated priorities
             for item in all_items:
                 self._queue.put(item)
-                
+            
+            self._notify()
             return True
             
     def get_active_downloads(self) -> List[str]:
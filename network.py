@@ -1,8 +1,10 @@
 """Network operations manager for the book downloader application."""
 
 import requests
+import threading
 import urllib.request
-from typing import Sequence, Tuple, Any, Union, cast, List, Optional, Callable
+from requests.adapters import HTTPAdapter
+from typing import Sequence, Tuple, Any, Union, cast, List, Optional, Callable, Dict
 import socket
 import dns.resolver
 from socket import AddressFamily, SocketKind
@@ -12,6 +14,9 @@ import ipaddress
 
 from logger import setup_logger
 from config import PROXIES, AA_BASE_URL, CUSTOM_DNS, AA_AVAILABLE_URLS, DOH_SERVER
+from env import MAX_CONCURRENT_DOWNLOADS, DOWNLOAD_SEGMENTS, MAX_RETRY, DEFAULT_SLEEP
+from env import RETRY_MAX_DELAY, RETRY_DEADLINE, RETRY_BUDGET_RATIO, RETRY_BUDGET_MAX, CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_RESET
+from retry import RetryBudget, RetryEngine, RetryPolicy
 import config
 
 logger = setup_logger(__name__)
@@ -320,12 +325,113 @@ def init_dns_resolvers():
 # Initialize DNS resolvers
 init_dns_resolvers()
 
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter reporting the connection counters of the pools it discards to its SessionManager."""
+
+    def __init__(self, manager: "SessionManager", **kwargs: Any) -> None:
+        self._manager = manager
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pools.dispose_func = self._manager._retire_pool
+
+    def proxy_manager_for(self, proxy: str, **proxy_kwargs: Any) -> Any:
+        created = proxy not in self.proxy_manager
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if created:
+            manager.pools.dispose_func = self._manager._retire_pool
+        return manager
+
+    def pool_managers(self) -> List[Any]:
+        return [self.poolmanager, *self.proxy_manager.values()]
+
+class SessionManager:
+    """Process-wide pool of keep-alive HTTP connections.
+
+    requests.Session is not thread-safe, so each thread gets its own Session,
+    but all of them mount the same adapters: connections to a host are pooled
+    and reused across threads. Proxies and headers are shared by all sessions.
+    """
+
+    def __init__(self, pool_maxsize: int, proxies: Dict[str, str], headers: Optional[Dict[str, str]] = None) -> None:
+        self.proxies = dict(proxies)
+        self.headers = dict(headers or {})
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._retired_requests = 0
+        self._retired_connections = 0
+        # pool_connections is the number of hosts kept, pool_maxsize the idle connections kept per host
+        adapter = _CountingAdapter(self, pool_connections=32, pool_maxsize=pool_maxsize)
+        self._adapters = {"https://": adapter, "http://": adapter}
+
+    def session(self) -> requests.Session:
+        """Return the calling thread's session."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.proxies.update(self.proxies)
+            session.headers.update(self.headers)
+            for prefix, adapter in self._adapters.items():
+                session.mount(prefix, adapter)
+            self._local.session = session
+        return session
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.session().get(url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.session().post(url, **kwargs)
+
+    def _retire_pool(self, pool: Any) -> None:
+        with self._lock:
+            self._retired_requests += pool.num_requests
+            self._retired_connections += pool.num_connections
+        pool.close()
+
+    def stats(self) -> Dict[str, int]:
+        """Count requests sent and connections opened since startup.
+
+        Returns:
+            Dict: requests, new_connections and reused_connections (requests
+            sent over an already open connection)
+        """
+        with self._lock:
+            total_requests = self._retired_requests
+            total_connections = self._retired_connections
+        for adapter in set(self._adapters.values()):
+            for pool_manager in adapter.pool_managers():
+                for key in pool_manager.pools.keys():
+                    pool = pool_manager.pools.get(key)
+                    if pool is not None:
+                        total_requests += pool.num_requests
+                        total_connections += pool.num_connections
+        return {
+            "requests": total_requests,
+            "new_connections": total_connections,
+            "reused_connections": max(total_requests - total_connections, 0),
+        }
+
+# Every download may use several connections to the same host when segmented
+session_manager = SessionManager(
+    pool_maxsize=max(10, MAX_CONCURRENT_DOWNLOADS * max(1, DOWNLOAD_SEGMENTS)),
+    proxies=PROXIES,
+)
+
+# Shared by every caller so that they back off together from a failing host
+retry_engine = RetryEngine(
+    policy=RetryPolicy(MAX_RETRY + 1, DEFAULT_SLEEP, RETRY_MAX_DELAY, RETRY_DEADLINE),
+    budget=RetryBudget(RETRY_BUDGET_RATIO, RETRY_BUDGET_MAX),
+    failure_threshold=CIRCUIT_BREAKER_THRESHOLD,
+    reset_timeout=CIRCUIT_BREAKER_RESET,
+)
+
 # Check available AA_BASE_URLs if set to auto
 if AA_BASE_URL == "auto":
     logger.info(f"AA_BASE_URL: auto, checking available urls {AA_AVAILABLE_URLS}")
     for url in AA_AVAILABLE_URLS:
         try:
-            response = requests.get(url, proxies=PROXIES)
+            response = session_manager.get(url)
             if response.status_code == 200:
                 AA_BASE_URL = url
                 break
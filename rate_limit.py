@@ -0,0 +1,72 @@
+"""Per-host request rate limiting shared across threads."""
+
+import time
+from threading import Lock
+from typing import Dict
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled at a constant rate."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        """Initialize a full bucket.
+
+        Args:
+            rate: Tokens added per second
+            burst: Maximum number of tokens, i.e. requests allowed back to back
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._lock = Lock()
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            # Tokens may go negative: later callers queue up behind earlier reservations
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> float:
+        """Wait until a token is available. Returns the time spent waiting."""
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class HostRateLimiter:
+    """One TokenBucket per host, so only requests to a busy host are delayed."""
+
+    def __init__(self, rate: float, burst: float) -> None:
+        """Initialize the limiter.
+
+        Args:
+            rate: Requests per second allowed to each host. A value <= 0 disables limiting.
+            burst: Requests allowed back to back to each host
+        """
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = Lock()
+        self.delayed = 0
+
+    def acquire(self, url: str) -> float:
+        """Wait until a request to the host of url is allowed. Returns the time spent waiting."""
+        if self.rate <= 0:
+            return 0.0
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        delay = bucket.acquire()
+        if delay > 0:
+            with self._lock:
+                self.delayed += 1
+        return delay
@@ -0,0 +1,205 @@
+"""Retry policies, a process-wide retry budget and per-host circuit breakers."""
+
+import random
+import time
+from threading import Event, Lock
+from typing import Callable, Dict, Optional, TypeVar
+from urllib.parse import urlparse
+
+import requests
+
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of contacting a host whose circuit breaker is open."""
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter, bounded by a number of attempts and a deadline."""
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float, deadline: float = 0) -> None:
+        """Initialize the policy.
+
+        Args:
+            max_attempts: Maximum number of attempts, including the first one
+            base_delay: Delay before the first retry, doubled for each following one
+            max_delay: Upper bound of a single delay
+            deadline: Maximum seconds spent on a call, retries included (<= 0 for none)
+        """
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    def backoff(self, attempt: int) -> float:
+        """Delay before retrying after the given (1-based) failed attempt."""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        # Half fixed, half random, so that callers failing together do not retry together
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+class RetryBudget:
+    """Caps retries to a fraction of the requests made, across all threads.
+
+    Every request deposits `ratio` tokens (up to `max_tokens`) and every retry
+    spends one, so a widespread outage cannot multiply the load by the number
+    of attempts.
+    """
+
+    def __init__(self, ratio: float, max_tokens: float) -> None:
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._lock = Lock()
+        self.exhausted = 0
+
+    def record_request(self) -> None:
+        with self._lock:
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Take a token for a retry. Returns False if the budget is exhausted."""
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            self.exhausted += 1
+            return False
+
+
+class CircuitBreaker:
+    """Fails fast after repeated failures, then lets a single probe through.
+
+    Closed: requests go through, consecutive failures are counted.
+    Open: after `failure_threshold` failures, requests are refused for `reset_timeout` seconds.
+    Half-open: one probe request is allowed; its outcome closes or reopens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = Lock()
+
+    def allow(self) -> bool:
+        """Check whether a request may be sent now."""
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold > 0:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+def is_host_failure(error: Exception) -> bool:
+    """Whether an error means the host itself is unhealthy (as opposed to e.g. a 404)."""
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        return error.response.status_code >= 500 or error.response.status_code == 429
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class RetryEngine:
+    """Runs calls to remote hosts under a RetryPolicy, a RetryBudget and per-host CircuitBreakers."""
+
+    def __init__(self, policy: RetryPolicy, budget: RetryBudget, failure_threshold: int, reset_timeout: float) -> None:
+        self.policy = policy
+        self.budget = budget
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = Lock()
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        """Return the circuit breaker of the host of url."""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def run(
+        self,
+        url: str,
+        call: Callable[[int], T],
+        should_retry: Callable[[Exception], bool] = lambda error: True,
+        policy: Optional[RetryPolicy] = None,
+        cancel_flag: Optional[Event] = None,
+    ) -> T:
+        """Call `call(attempt)` until it succeeds or retrying is not allowed anymore.
+
+        Args:
+            url: URL contacted by the call, whose host's breaker is checked and updated
+            call: Function performing one attempt, given the 1-based attempt number
+            should_retry: Whether an error raised by the call is worth retrying
+            policy: Override the engine's retry policy
+            cancel_flag: Stops waiting between attempts when set
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: If the host's circuit breaker refuses the request
+            Exception: The last error raised by the call when giving up
+        """
+        policy = policy or self.policy
+        breaker = self.breaker(url)
+        started_at = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open for {urlparse(url).netloc}, not contacting it for now")
+            self.budget.record_request()
+            try:
+                result = call(attempt)
+            except Exception as e:
+                if is_host_failure(e):
+                    breaker.record_failure()
+                else:
+                    # The host answered, even if the answer is not usable
+                    breaker.record_success()
+                if attempt >= policy.max_attempts or not should_retry(e):
+                    raise
+                delay = policy.backoff(attempt)
+                if policy.deadline > 0 and time.monotonic() - started_at + delay > policy.deadline:
+                    logger.warning(f"Giving up on {url}: retrying would exceed the {policy.deadline}s deadline")
+                    raise
+                if not self.budget.try_spend():
+                    logger.warning(f"Giving up on {url}: retry budget exhausted")
+                    raise
+                logger.warning(f"Retrying {url} in {delay:.1f} seconds (attempt {attempt}/{policy.max_attempts}): {e}")
+                if cancel_flag is not None:
+                    if cancel_flag.wait(delay):
+                        raise
+                else:
+                    time.sleep(delay)
+                continue
+            breaker.record_success()
+            return result
@@ -0,0 +1,185 @@
+"""Persistent download statistics per source, used to order download links."""
+
+import random
+import sqlite3
+import statistics
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from threading import Lock
+from typing import Collection, Dict, List, Optional, Tuple
+
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Weight of the latest outcome in the moving averages, so that sources that
+# recover (or degrade) are noticed after a few downloads
+_SMOOTHING = 0.2
+# Sources never get a success rate lower than this when estimating completion times
+_MIN_SUCCESS_RATE = 0.05
+
+
+@dataclass
+class SourceStats:
+    """Download outcomes of a source class or host.
+
+    Rates and times are exponential moving averages, updated after each download.
+    """
+    kind: str
+    key: str
+    attempts: int = 0
+    successes: int = 0
+    success_rate: float = 0.5
+    resolve_time: Optional[float] = None
+    first_byte_time: Optional[float] = None
+    speed: Optional[float] = None
+    updated_at: float = 0.0
+
+    def record(self, success: bool, resolve_time: Optional[float], first_byte_time: Optional[float], speed: Optional[float]) -> None:
+        self.attempts += 1
+        self.success_rate += _SMOOTHING * ((1.0 if success else 0.0) - self.success_rate)
+        if success:
+            self.successes += 1
+            self.resolve_time = _smooth(self.resolve_time, resolve_time)
+            self.first_byte_time = _smooth(self.first_byte_time, first_byte_time)
+            self.speed = _smooth(self.speed, speed)
+        self.updated_at = time.time()
+
+    def expected_time(self, size: float) -> Optional[float]:
+        """Expected seconds to download size bytes from this source, failures included.
+
+        Returns None until a download from this source succeeded.
+        """
+        if self.speed is None or self.speed <= 0:
+            return None
+        duration = (self.resolve_time or 0.0) + (self.first_byte_time or 0.0) + size / self.speed
+        # Failed attempts cost about as much as successful ones before moving on
+        return duration / max(self.success_rate, _MIN_SUCCESS_RATE)
+
+
+def _smooth(average: Optional[float], value: Optional[float]) -> Optional[float]:
+    if value is None:
+        return average
+    if average is None:
+        return value
+    return average + _SMOOTHING * (value - average)
+
+
+class SourceStatsStore:
+    """Per source class and per host download statistics, kept in memory and in SQLite."""
+
+    def __init__(self, path: Path, exploration_rate: float) -> None:
+        self.path = path
+        self.exploration_rate = exploration_rate
+        self._lock = Lock()
+        self._stats: Dict[Tuple[str, str], SourceStats] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self._open()
+
+    def _open(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS source_stats ("
+                " kind TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " attempts INTEGER NOT NULL,"
+                " successes INTEGER NOT NULL,"
+                " success_rate REAL NOT NULL,"
+                " resolve_time REAL,"
+                " first_byte_time REAL,"
+                " speed REAL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (kind, key))"
+            )
+            for row in conn.execute(
+                "SELECT kind, key, attempts, successes, success_rate, resolve_time, first_byte_time, speed, updated_at FROM source_stats"
+            ):
+                stats = SourceStats(*row)
+                self._stats[(stats.kind, stats.key)] = stats
+            self._conn = conn
+            logger.info(f"Source statistics opened at {self.path} ({len(self._stats)} sources)")
+        except Exception as e:
+            logger.warning(f"Source statistics will not be persisted, failed to open {self.path}: {e}")
+            self._conn = None
+
+    def record(self, keys: List[Tuple[str, str]], success: bool, resolve_time: Optional[float] = None,
+               first_byte_time: Optional[float] = None, speed: Optional[float] = None) -> None:
+        """Record the outcome of a download for each (kind, key) it involved.
+
+        Args:
+            keys: Source class and host of the download, as (kind, key) pairs
+            success: Whether the book was downloaded
+            resolve_time: Seconds spent getting the download URL (bypass and countdowns included)
+            first_byte_time: Seconds between requesting the file and receiving its first byte
+            speed: Average bytes per second of the transfer
+        """
+        with self._lock:
+            for kind, key in keys:
+                stats = self._stats.get((kind, key))
+                if stats is None:
+                    stats = self._stats[(kind, key)] = SourceStats(kind, key)
+                stats.record(success, resolve_time, first_byte_time, speed)
+                self._save(stats)
+
+    def _save(self, stats: SourceStats) -> None:
+        if self._conn is None:
+            return
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO source_stats"
+                " (kind, key, attempts, successes, success_rate, resolve_time, first_byte_time, speed, updated_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (stats.kind, stats.key, stats.attempts, stats.successes, stats.success_rate,
+                 stats.resolve_time, stats.first_byte_time, stats.speed, stats.updated_at),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to save statistics of {stats.kind} {stats.key}: {e}")
+
+    def rank(self, links: List[str], keys: List[Tuple[str, str]], size: float, pinned: Collection[str] = ()) -> List[str]:
+        """Order links by expected completion time, fastest first.
+
+        Links whose source has no successful download yet are given the median
+        expected time of the others, scaled by their failures. With
+        probability exploration_rate, one of them is moved up, right after the
+        pinned links, so that sources that failed in the past get a chance to
+        show they recovered without delaying proven ones that are pinned.
+
+        Args:
+            links: Download links, in their default order
+            keys: (kind, key) of the source of each link
+            size: Expected size of the file in bytes
+            pinned: Keys of sources that exploration never moves a link in front of
+        """
+        with self._lock:
+            sources = [self._stats.get(key) for key in keys]
+            expected = [stats.expected_time(size) if stats is not None else None for stats in sources]
+        known = [estimate for estimate in expected if estimate is not None]
+        if not known:
+            return list(links)
+        neutral = statistics.median(known)
+
+        def estimate(i: int) -> float:
+            if expected[i] is not None:
+                return expected[i]
+            # Without timings, only the success rate (0.5 before any download) sets a source apart
+            success_rate = sources[i].success_rate if sources[i] is not None else 0.5
+            return neutral * 0.5 / max(success_rate, _MIN_SUCCESS_RATE)
+
+        # sorted() is stable, so links with equal estimates keep their default order
+        order = sorted(range(len(links)), key=estimate)
+        if random.random() < self.exploration_rate:
+            front = max((position + 1 for position, i in enumerate(order) if keys[i][1] in pinned), default=0)
+            untried = [position for position in range(front + 1, len(order)) if expected[order[position]] is None]
+            if untried:
+                order.insert(front, order.pop(random.choice(untried)))
+        return [links[i] for i in order]
+
+    def snapshot(self) -> List[Dict]:
+        """Return all statistics, sources first, then hosts."""
+        with self._lock:
+            return [asdict(stats) for stats in sorted(self._stats.values(), key=lambda stats: (stats.kind != "source", stats.kind, stats.key))]
@@ -145,6 +145,7 @@
     resultsGrid: document.getElementById('results-grid'),
     noResults: document.getElementById('no-results'),
     searchLoading: document.getElementById('search-loading'),
+    loadMoreBtn: document.getElementById('load-more-button'),
     modalOverlay: document.getElementById('modal-overlay'),
     detailsContainer: document.getElementById('details-container'),
     refreshStatusBtn: document.getElementById('refresh-status-button'),
@@ -176,6 +177,7 @@
   // ---- Constants ----
   const API = {
     search: '/request/api/search',
+    searchStream: '/request/api/search/stream',
     info: '/request/api/info',
     download: '/request/api/download',
     status: '/request/api/status',
@@ -370,31 +372,89 @@
     return wrapper.firstElementChild;
   }
 
-  function renderCards(books) {
-    el.resultsGrid.innerHTML = '';
-    if (!books || books.length === 0) {
+  function renderCards(books, append = false) {
+    if (!append) el.resultsGrid.innerHTML = '';
+    if (!append && (!books || books.length === 0)) {
       utils.show(el.noResults);
       return;
     }
     utils.hide(el.noResults);
     const frag = document.createDocumentFragment();
-    books.forEach((b) => frag.appendChild(renderCard(b)));
+    (books || []).forEach((b) => frag.appendChild(renderCard(b)));
     el.resultsGrid.appendChild(frag);
   }
 
   // ---- Search ----
   const search = {
+    qs: '',
+    nextPage: null,
+    async fetchPage(page) {
+      const res = await fetch(`${API.search}?${this.qs}&page=${page}`);
+      if (!res.ok) throw new Error(`${res.status} ${res.statusText}`);
+      this.nextPage = res.headers.get('X-Next-Page');
+      return await res.json();
+    },
+    updateLoadMore() {
+      if (this.nextPage) utils.show(el.loadMoreBtn); else utils.hide(el.loadMoreBtn);
+    },
+    // Same ordering as /api/search: preferred formats (SUPPORTED_FORMATS order) first
+    sortByFormat(books) {
+      const formats = (el.resultsGrid?.dataset.supportedFormats || '').split(',');
+      const rank = (book) => { const i = formats.indexOf(book.format); return i === -1 ? formats.length : i; };
+      return books.slice().sort((a, b) => rank(a) - rank(b));
+    },
+    // Render each book as soon as the server has parsed it (NDJSON stream)
+    async streamPage(page, onBook) {
+      const res = await fetch(`${API.searchStream}?${this.qs}&page=${page}`);
+      if (!res.ok) throw new Error(`${res.status} ${res.statusText}`);
+      const reader = res.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let count = 0;
+      while (true) {
+        const { done, value } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter((line) => line.trim()).forEach((line) => { onBook(JSON.parse(line)); count++; });
+        if (done) break;
+      }
+      return count;
+    },
     async run() {
-      const qs = utils.buildQuery();
-      if (!qs) { renderCards([]); return; }
+      this.qs = utils.buildQuery();
+      this.nextPage = null;
+      this.updateLoadMore();
+      if (!this.qs) { renderCards([]); return; }
       utils.show(el.searchLoading);
+      el.resultsGrid.innerHTML = '';
+      utils.hide(el.noResults);
       try {
-        const data = await utils.j(`${API.search}?${qs}`);
-        renderCards(data);
+        const books = [];
+        await this.streamPage(1, (book) => { books.push(book); renderCards([book], true); });
+        // Books are streamed in page order, reorder them once the page is complete
+        renderCards(this.sortByFormat(books));
+        this.nextPage = books.length > 0 ? 2 : null;
       } catch (e) {
         renderCards([]);
       } finally {
         utils.hide(el.searchLoading);
+        this.updateLoadMore();
+      }
+    },
+    async loadMore() {
+      if (!this.nextPage) return;
+      utils.show(el.searchLoading);
+      try {
+        const data = await this.fetchPage(this.nextPage);
+        // Skip books already displayed from earlier pages
+        const shown = new Set(Array.from(el.resultsGrid.querySelectorAll('[data-action="details"]')).map((b) => b.dataset.id));
+        renderCards((data || []).filter((b) => !shown.has(b.id)), true);
+      } catch (e) {
+        this.nextPage = null;
+      } finally {
+        utils.hide(el.searchLoading);
+        this.updateLoadMore();
       }
     }
   };
@@ -530,7 +590,7 @@
       } finally { utils.hide(el.statusLoading); }
     },
     render(data) {
-      // data shape: {queued: {...}, downloading: {...}, completed: {...}, error: {...}}
+      // data shape: {resolving: {...}, queued: {...}, waiting: {...}, downloading: {...}, completed: {...}, error: {...}}
       const sections = [];
       for (const [name, items] of Object.entries(data || {})) {
         if (!items || Object.keys(items).length === 0) continue;
@@ -539,7 +599,7 @@
           const maybeLinkedTitle = b.download_path
             ? `<a href="/request/api/localdownload?id=${encodeURIComponent(b.id)}" class="text-blue-600 hover:underline">${titleText}</a>`
             : titleText;
-          const actions = (name === 'queued' || name === 'downloading')
+          const actions = (name === 'resolving' || name === 'queued' || name === 'waiting' || name === 'downloading')
             ? `<button class="px-2 py-1 rounded border text-xs" data-cancel="${utils.e(b.id)}" style="border-color: var(--border-muted);">Cancel</button>`
             : '';
           const progress = (name === 'downloading' && typeof b.progress === 'number')
@@ -1040,7 +1100,7 @@
         // Clear any previous error state before rendering
         this.clearErrorState();
         
-        // data shape: {queued: {...}, downloading: {...}, completed: {...}, error: {...}}
+        // data shape: {resolving: {...}, queued: {...}, waiting: {...}, downloading: {...}, completed: {...}, error: {...}}
         const sections = [];
         let hasActiveDownloads = false;
         
@@ -1070,7 +1130,7 @@
           if (!items || typeof items !== 'object' || Object.keys(items).length === 0) continue;
           
           // Track if there are active downloads
-          if (name === 'downloading' || name === 'queued') {
+          if (name === 'downloading' || name === 'queued' || name === 'waiting' || name === 'resolving') {
             hasActiveDownloads = true;
           }
           
@@ -1085,7 +1145,7 @@
             const maybeLinkedTitle = b.download_path
               ? `<a href="/request/api/localdownload?id=${encodeURIComponent(b.id)}" class="text-blue-600 hover:underline">${titleText}</a>`
               : titleText;
-            const actions = (name === 'queued' || name === 'downloading')
+            const actions = (name === 'resolving' || name === 'queued' || name === 'waiting' || name === 'downloading')
               ? `<button class="px-2 py-1 rounded border text-xs" data-cancel="${utils.e(b.id)}" style="border-color: var(--border-muted);">Cancel</button>`
               : '';
             const progress = (name === 'downloading' && typeof b.progress === 'number')
@@ -1178,9 +1238,9 @@
         }
       });
       
-      // Count real items (queued + downloading)
+      // Count real items (resolving + queued + waiting + downloading)
       const realItems = allRealItems.filter(li =>
-        li.textContent.includes('downloading') || li.textContent.includes('queued')
+        li.textContent.includes('downloading') || li.textContent.includes('queued') || li.textContent.includes('waiting') || li.textContent.includes('resolving')
       );
       
       // Add ONLY optimistic items that don't have a real counterpart yet
@@ -1375,6 +1435,7 @@
   // ---- Wire up ----
   function initEvents() {
     el.searchBtn?.addEventListener('click', () => search.run());
+    el.loadMoreBtn?.addEventListener('click', () => search.loadMore());
     el.searchInput?.addEventListener('keydown', (e) => { if (e.key === 'Enter') search.run(); });
     document.getElementById('adv-search-button')?.addEventListener('click', () => search.run());
 
@@ -0,0 +1,148 @@
+"""Benchmark how fast the download coordinator dispatches queued books.
+
+Downloads are replaced by a stand-in that only records when it starts and
+waits to be released, so the numbers only measure the coordinator. For the
+original loop (sleeping between queue checks) and for the event-driven
+backend.concurrent_download_loop, reports:
+    - queue latency: from BookQueue.add() to the download starting, with free slots
+    - slot latency: from a download finishing to a waiting book starting
+    - idle wakeups: queue checks per second while there is nothing to do
+
+Usage (from the repository root):
+    ENABLE_LOGGING=false TMP_DIR=/tmp/cwa-tmp INGEST_DIR=/tmp/cwa-ingest \\
+        python -m testing.benchmark_dispatch [samples] [poll_interval]
+"""
+
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+import backend
+from env import MAX_CONCURRENT_DOWNLOADS
+from models import BookInfo, BookQueue, book_queue
+
+DEFAULT_SAMPLES = 5
+DEFAULT_POLL_INTERVAL = 5.0
+IDLE_SECONDS = 3.0
+
+
+class StandIn:
+    """Replaces _process_single_download, recording start times and blocking until released."""
+
+    def __init__(self, queue: BookQueue) -> None:
+        self.queue = queue
+        self.started: Dict[str, float] = {}
+        self.released: Dict[str, threading.Event] = {}
+        self.finished: Dict[str, float] = {}
+        self._condition = threading.Condition()
+
+    def __call__(self, book_id: str, cancel_flag: threading.Event) -> None:
+        release = threading.Event()
+        with self._condition:
+            self.released[book_id] = release
+            self.started[book_id] = time.perf_counter()
+            self._condition.notify_all()
+        release.wait()
+        self.finished[book_id] = time.perf_counter()
+
+    def wait_started(self, book_id: str, timeout: float = 60) -> float:
+        with self._condition:
+            if not self._condition.wait_for(lambda: book_id in self.started, timeout):
+                raise TimeoutError(f"{book_id} was never dispatched")
+            return self.started[book_id]
+
+    def release(self, book_id: str) -> None:
+        self.released[book_id].set()
+
+
+def polling_loop(queue: BookQueue, process: Callable, poll_interval: float) -> None:
+    """The original coordinator: check the queue, then sleep."""
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_DOWNLOADS) as executor:
+        active_futures: Dict[Future, str] = {}
+        while True:
+            for future in [f for f in active_futures if f.done()]:
+                active_futures.pop(future)
+            while len(active_futures) < MAX_CONCURRENT_DOWNLOADS:
+                next_download = queue.get_next()
+                if not next_download:
+                    break
+                book_id, cancel_flag = next_download
+                active_futures[executor.submit(process, book_id, cancel_flag)] = book_id
+            time.sleep(poll_interval)
+
+
+def count_queue_checks(queue: BookQueue, seconds: float) -> int:
+    checks = 0
+    get_next = queue.get_next
+
+    def counting_get_next():
+        nonlocal checks
+        checks += 1
+        return get_next()
+
+    queue.get_next = counting_get_next
+    time.sleep(seconds)
+    del queue.get_next
+    return checks
+
+
+def measure(name: str, queue: BookQueue, stand_in: StandIn, samples: int) -> None:
+    prefix = f"{name}-{time.time_ns()}"
+    queue_latencies: List[float] = []
+    slot_latencies: List[float] = []
+
+    for i in range(samples):
+        book_id = f"{prefix}-q{i}"
+        added = time.perf_counter()
+        queue.add(book_id, BookInfo(id=book_id, title=book_id))
+        queue_latencies.append(stand_in.wait_started(book_id) - added)
+        stand_in.release(book_id)
+
+    for i in range(samples):
+        # Fill every slot, queue one more book, then free a slot
+        running = [f"{prefix}-s{i}-{slot}" for slot in range(MAX_CONCURRENT_DOWNLOADS)]
+        for book_id in running:
+            queue.add(book_id, BookInfo(id=book_id, title=book_id))
+            stand_in.wait_started(book_id)
+        waiting = f"{prefix}-s{i}-next"
+        queue.add(waiting, BookInfo(id=waiting, title=waiting))
+        time.sleep(0.05)
+        stand_in.release(running[0])
+        started = stand_in.wait_started(waiting)
+        while running[0] not in stand_in.finished:
+            time.sleep(0.001)
+        slot_latencies.append(started - stand_in.finished[running[0]])
+        for book_id in running[1:] + [waiting]:
+            stand_in.release(book_id)
+
+    time.sleep(0.1)
+    wakeups = count_queue_checks(queue, IDLE_SECONDS) / IDLE_SECONDS
+    print(
+        f"{name:<14} {statistics.median(queue_latencies) * 1000:>12.1f} {max(queue_latencies) * 1000:>10.1f}"
+        f" {statistics.median(slot_latencies) * 1000:>12.1f} {max(slot_latencies) * 1000:>10.1f} {wakeups:>12.2f}"
+    )
+
+
+def main(samples: int, poll_interval: float) -> None:
+    print(f"{samples} samples, {MAX_CONCURRENT_DOWNLOADS} download slots")
+    print(f"{'coordinator':<14} {'queue p50 ms':>12} {'max ms':>10} {'slot p50 ms':>12} {'max ms':>10} {'idle wakeups/s':>12}")
+
+    polling_queue = BookQueue()
+    polling_stand_in = StandIn(polling_queue)
+    threading.Thread(target=polling_loop, args=(polling_queue, polling_stand_in, poll_interval), daemon=True).start()
+    measure(f"polling {poll_interval:g}s", polling_queue, polling_stand_in, samples)
+
+    # The event-driven coordinator started with backend looks the function up on every dispatch
+    event_stand_in = StandIn(book_queue)
+    backend._process_single_download = event_stand_in
+    measure("event-driven", book_queue, event_stand_in, samples)
+
+
+if __name__ == "__main__":
+    main(
+        int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SAMPLES,
+        float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_POLL_INTERVAL,
+    )
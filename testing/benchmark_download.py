@@ -0,0 +1,96 @@
+"""Benchmark download_url against a local HTTP stand-in.
+
+Serves a file of random bytes from a local HTTP server and reports, for the
+original fixed 1 KB chunk loop (progress published on every chunk) and for
+download_url (adaptive chunk size, throttled progress), the wall time, the CPU
+time per MB and the number of progress updates, which each take the queue lock.
+
+Usage (from the repository root):
+    ENABLE_LOGGING=false TMP_DIR=/tmp/cwa-tmp INGEST_DIR=/tmp/cwa-ingest \\
+        python -m testing.benchmark_download [size_mb]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Optional
+
+import requests
+
+import downloader
+from models import BookQueue, BookInfo
+
+DEFAULT_SIZE_MB = 64
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+def serve(directory: str) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), lambda *args: QuietHandler(*args, directory=directory))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fixed_chunk_download(link: str, book_path: Path, progress_callback: Optional[Callable[[float], None]]) -> bool:
+    """The original download loop: 1 KB chunks, progress on every chunk."""
+    with requests.get(link, stream=True) as response:
+        total_size = float(response.headers.get("content-length", 0))
+        done = 0
+        with open(book_path, "wb") as f:
+            for chunk in response.iter_content(chunk_size=1000):
+                f.write(chunk)
+                done += len(chunk)
+                if progress_callback is not None:
+                    progress_callback(done * 100.0 / total_size)
+    return True
+
+
+def adaptive_download(link: str, book_path: Path, progress_callback: Optional[Callable[[float], None]]) -> bool:
+    return downloader.download_url(link, book_path, "", progress_callback)
+
+
+def measure(name: str, download: Callable, link: str, book_path: Path, size_mb: int) -> None:
+    queue = BookQueue()
+    queue.add("bench", BookInfo(id="bench", title="bench"))
+    updates = 0
+
+    def progress_callback(progress: float) -> None:
+        nonlocal updates
+        updates += 1
+        queue.update_progress("bench", progress)
+
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    download(link, book_path, progress_callback)
+    cpu = time.process_time() - cpu
+    wall = time.perf_counter() - wall
+    assert book_path.stat().st_size == size_mb * 1024 * 1024
+    book_path.unlink()
+    print(f"{name:<16} {wall:>8.2f} {cpu * 1000 / size_mb:>12.1f} {updates:>10}")
+
+
+def main(size_mb: int) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "book.bin"), "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+        server = serve(directory)
+        link = f"http://127.0.0.1:{server.server_address[1]}/book.bin"
+        book_path = Path(directory) / "downloaded.bin"
+
+        print(f"{size_mb} MB over {link}")
+        print(f"{'loop':<16} {'wall (s)':>8} {'CPU ms / MB':>12} {'updates':>10}")
+        measure("fixed 1 KB", fixed_chunk_download, link, book_path, size_mb)
+        measure("adaptive", adaptive_download, link, book_path, size_mb)
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SIZE_MB)
@@ -0,0 +1,94 @@
+"""Benchmark the available HTML parser backends on AA pages.
+
+Compares parse time and peak Python memory for every installed backend, so the
+HTML_PARSER default can be chosen from data rather than guesswork.
+
+Usage (from the repository root):
+    ENABLE_LOGGING=false python -m testing.benchmark_html_parser [page.html ...]
+
+Pass saved search or /md5/ pages to benchmark real responses. Without arguments,
+synthetic pages shaped like the AA search results and book pages are used.
+"""
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+from html_parser import available_backends, parse_html
+
+ITERATIONS = 5
+
+
+def synthetic_search_page(rows: int = 100) -> str:
+    """Build a page resembling the AA table search results (navigation, scripts, ads and rows)."""
+    nav = "".join(f'<li><a href="/nav/{i}">Navigation {i}</a></li>' for i in range(200))
+    scripts = "".join(f"<script>var x{i} = {{'a': {i}, 'b': [1, 2, 3]}};</script>" for i in range(50))
+    table_rows = []
+    for i in range(rows):
+        if i % 10 == 0:
+            table_rows.append('<tr class="ad"><td colspan="11"><div class="ad-slot">Advertisement</div></td></tr>')
+            continue
+        cells = [f'<td><a href="/md5/{i:032x}"><img src="/covers/{i}.jpg"></a></td>']
+        for field in ["Title", "Author", "Publisher", "2001", "", "", "English", "", "EPUB", "1.2MB"]:
+            cells.append(f'<td><a href="/md5/{i:032x}"><span class="whitespace-nowrap">{field} {i}</span></a></td>')
+        table_rows.append(f'<tr class="h-full">{"".join(cells)}</tr>')
+    return (
+        "<!DOCTYPE html><html><head><title>Search</title>"
+        f"{scripts}</head><body><header><ul>{nav}</ul></header>"
+        f"<main><div class='main-inner'><table>{''.join(table_rows)}</table></div></main>"
+        f"<footer>{nav}</footer></body></html>"
+    )
+
+
+def synthetic_book_page() -> str:
+    """Build a page resembling an AA /md5/ book page."""
+    links = "".join(
+        f'<li><a href="/slow_download/{i}">Slow Partner Server #{i}</a> (no waitlist)</li>' for i in range(10)
+    )
+    metadata = "".join(f"<div><div>ISBN-13</div><div>978000000{i:04d}</div></div>" for i in range(200))
+    nav = "".join(f'<li><a href="/nav/{i}">Navigation {i}</a></li>' for i in range(200))
+    return (
+        "<!DOCTYPE html><html><head><title>Book</title></head><body>"
+        f"<header><ul>{nav}</ul></header><main><div><div><img src='/cover.jpg'></div></div>"
+        "<div class='main-inner'></div><div><div>Title 🔍</div><div>Author</div><div>Publisher</div>"
+        f"<div>English · EPUB · 1.2MB</div><div><div>{metadata}</div></div><ul>{links}</ul></div>"
+        "</main></body></html>"
+    )
+
+
+def measure(fn: Callable[[], object]) -> Tuple[float, float]:
+    """Return (average seconds, peak MiB) for fn over ITERATIONS runs."""
+    fn()  # Warm up
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        fn()
+    elapsed = (time.perf_counter() - start) / ITERATIONS
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def main(paths: List[str]) -> None:
+    pages: Dict[str, str] = {}
+    for path in paths:
+        pages[Path(path).name] = Path(path).read_text(encoding="utf-8", errors="replace")
+    if not pages:
+        pages["synthetic-search"] = synthetic_search_page()
+        pages["synthetic-book"] = synthetic_book_page()
+
+    backends = available_backends()
+    print(f"Backends: {', '.join(backends)} ({ITERATIONS} iterations each)")
+    print(f"{'page':<24} {'backend':<12} {'KiB':>8} {'ms/parse':>10} {'peak MiB':>10}")
+    for name, html in pages.items():
+        for backend in backends:
+            elapsed, peak = measure(lambda: parse_html(html, backend=backend).find_all("tr"))
+            print(f"{name:<24} {backend:<12} {len(html) / 1024:>8.0f} {elapsed * 1000:>10.1f} {peak:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
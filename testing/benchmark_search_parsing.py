@@ -0,0 +1,58 @@
+"""Benchmark full-page vs. partial parsing of AA search results.
+
+Reports rows/sec for the original path (parse the whole page, find the table,
+parse every row) against the restricted path used with SEARCH_PARTIAL_PARSE
+(parse only the results table and drop ad rows before tree construction).
+
+Usage (from the repository root):
+    ENABLE_LOGGING=false AA_BASE_URL=https://annas-archive.org \\
+        python -m testing.benchmark_search_parsing [search_page.html ...]
+"""
+
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+from bs4 import Tag
+
+import book_manager
+from html_parser import available_backends, parse_html, parse_table_rows
+from testing.benchmark_html_parser import synthetic_search_page
+
+ITERATIONS = 5
+
+
+def full_page_rows(html: str, backend: str) -> List[Tag]:
+    table = parse_html(html, backend=backend).find("table")
+    return table.find_all("tr") if isinstance(table, Tag) else []
+
+
+def partial_rows(html: str, backend: str) -> List[Tag]:
+    return parse_table_rows(html, skip_classes=book_manager._SKIPPED_ROW_CLASSES, backend=backend) or []
+
+
+def rows_per_second(html: str, backend: str, extract: Callable[[str, str], List[Tag]]) -> float:
+    books = 0
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        books = sum(1 for row in extract(html, backend) if book_manager._parse_search_result_row(row))
+    elapsed = time.perf_counter() - start
+    return books * ITERATIONS / elapsed
+
+
+def main(paths: List[str]) -> None:
+    pages = {Path(p).name: Path(p).read_text(encoding="utf-8", errors="replace") for p in paths}
+    if not pages:
+        pages["synthetic-search"] = synthetic_search_page()
+
+    print(f"{'page':<24} {'backend':<12} {'full rows/s':>12} {'partial rows/s':>15} {'speedup':>8}")
+    for name, html in pages.items():
+        for backend in available_backends():
+            full = rows_per_second(html, backend, full_page_rows)
+            partial = rows_per_second(html, backend, partial_rows)
+            print(f"{name:<24} {backend:<12} {full:>12.0f} {partial:>15.0f} {partial / full:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
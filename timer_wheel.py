@@ -0,0 +1,82 @@
+"""Hashed timing wheel running callbacks after a delay."""
+
+import math
+import time
+from threading import Lock, Thread
+from typing import Callable, List, Optional
+
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class Timer:
+    """A callback scheduled on a TimerWheel."""
+
+    def __init__(self, callback: Callable[[], None], rounds: int) -> None:
+        self.callback = callback
+        # Full turns of the wheel left before the timer is due when its slot comes up
+        self.rounds = rounds
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """Prevent the callback from running, if it has not run yet."""
+        self.cancelled = True
+
+
+class TimerWheel:
+    """Runs callbacks after a delay, with a resolution of one tick.
+
+    Timers are hashed into `slots` buckets by expiry tick, so scheduling and
+    cancelling are O(1) and each tick only looks at one bucket, however many
+    timers are pending. Delays longer than a full turn of the wheel are
+    handled by counting the turns left. Callbacks run on the wheel's thread
+    and should be quick.
+    """
+
+    def __init__(self, tick: float = 1.0, slots: int = 512, name: str = "TimerWheel") -> None:
+        self.tick = tick
+        self.name = name
+        self._slots: List[List[Timer]] = [[] for _ in range(slots)]
+        self._position = 0
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> Timer:
+        """Run callback in delay seconds (rounded up to the next tick).
+
+        Returns:
+            Timer: Handle that can be used to cancel the callback
+        """
+        ticks = max(1, math.ceil(delay / self.tick))
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+            timer = Timer(callback, (ticks - 1) // len(self._slots))
+            self._slots[(self._position + ticks) % len(self._slots)].append(timer)
+        return timer
+
+    def _run(self) -> None:
+        next_tick = time.monotonic() + self.tick
+        while True:
+            time.sleep(max(0.0, next_tick - time.monotonic()))
+            next_tick += self.tick
+            with self._lock:
+                self._position = (self._position + 1) % len(self._slots)
+                due = []
+                pending = []
+                for timer in self._slots[self._position]:
+                    if timer.cancelled:
+                        continue
+                    if timer.rounds == 0:
+                        due.append(timer)
+                    else:
+                        timer.rounds -= 1
+                        pending.append(timer)
+                self._slots[self._position] = pending
+            for timer in due:
+                try:
+                    timer.callback()
+                except Exception as e:
+                    logger.error_trace(f"Timer callback failed: {e}")
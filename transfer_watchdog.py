@@ -0,0 +1,172 @@
+"""Watchdog aborting downloads that stop receiving data or stay too slow."""
+
+import collections
+import socket
+import time
+from contextlib import contextmanager
+from threading import Lock, Thread
+from typing import Deque, Iterator, Optional, Set, Tuple
+
+import requests
+import urllib3
+
+from logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class TransferStalledError(requests.exceptions.Timeout):
+    """Raised when a transfer receives no data for too long or stays under the minimum speed."""
+
+
+class TransferWatch:
+    """Bytes received by one watched transfer."""
+
+    def __init__(self, link: str) -> None:
+        self.link = link
+        self.received = 0
+        self.last_activity = time.monotonic()
+        self.response: Optional[requests.Response] = None
+        self.stalled: Optional[str] = None
+        # (time, bytes received) samples taken by the watchdog, oldest first
+        self.samples: Deque[Tuple[float, int]] = collections.deque()
+
+    def attach(self, response: requests.Response) -> None:
+        """Set the response to abort if the transfer stalls."""
+        self.response = response
+
+    def record(self, size: int) -> None:
+        self.received += size
+        self.last_activity = time.monotonic()
+
+    def raise_if_stalled(self) -> None:
+        """Raise TransferStalledError if the watchdog aborted this transfer.
+
+        An aborted transfer can end like a complete one, so this must be
+        checked before using the data received.
+        """
+        if self.stalled is not None:
+            raise TransferStalledError(f"Transfer from {self.link} stalled: {self.stalled}")
+
+    def abort(self, reason: str) -> None:
+        """Mark the transfer as stalled and unblock any read in progress."""
+        self.stalled = reason
+        response = self.response
+        if response is None:
+            return
+        # Closing the response does not wake up a thread blocked reading its socket, shutting it down does
+        connection = getattr(response.raw, "connection", None)
+        sock = getattr(connection, "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class TransferWatchdog:
+    """Aborts transfers receiving nothing for `idle_timeout` seconds, or less than
+    `min_speed` bytes per second over the last `window` seconds.
+
+    Transfers are checked every second by a background thread, so a transfer
+    blocked in a read is aborted too.
+    """
+
+    def __init__(self, idle_timeout: float, min_speed: float, window: float) -> None:
+        """Initialize the watchdog.
+
+        Args:
+            idle_timeout: Seconds without data after which a transfer is aborted (<= 0 to disable)
+            min_speed: Bytes per second under which a transfer is aborted (<= 0 to disable)
+            window: Seconds over which the speed of a transfer is measured
+        """
+        self.idle_timeout = idle_timeout
+        self.min_speed = min_speed
+        self.window = window
+        self.stalls = 0
+        self._watches: Set[TransferWatch] = set()
+        self._lock = Lock()
+        self._thread: Optional[Thread] = None
+
+    @property
+    def read_timeout(self) -> Optional[float]:
+        """Read timeout to give requests, which also covers waiting for the response headers."""
+        return self.idle_timeout if self.idle_timeout > 0 else None
+
+    @contextmanager
+    def watch(self, link: str) -> Iterator[TransferWatch]:
+        """Watch a transfer from link for the duration of the block.
+
+        Read timeouts and errors caused by the watchdog aborting the transfer
+        are raised as TransferStalledError.
+        """
+        watch = TransferWatch(link)
+        with self._lock:
+            self._watches.add(watch)
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="TransferWatchdog", daemon=True)
+                self._thread.start()
+        try:
+            yield watch
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, OSError) as e:
+            if watch.stalled is None and not _is_read_timeout(e):
+                raise
+            if watch.stalled is None:
+                watch.stalled = f"no data received for {self.idle_timeout:.0f} seconds"
+                self._count_stall(watch)
+            raise TransferStalledError(f"Transfer from {link} stalled: {watch.stalled}") from e
+        finally:
+            self.unwatch(watch)
+
+    def unwatch(self, watch: TransferWatch) -> None:
+        """Stop checking a transfer before the end of its watch block."""
+        with self._lock:
+            self._watches.discard(watch)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(1)
+            with self._lock:
+                watches = list(self._watches)
+            now = time.monotonic()
+            for watch in watches:
+                if watch.stalled is None:
+                    reason = self._check(watch, now)
+                    if reason is not None:
+                        watch.abort(reason)
+                        self._count_stall(watch)
+
+    def _check(self, watch: TransferWatch, now: float) -> Optional[str]:
+        """Return why a transfer is stalled, or None if it is not."""
+        if self.idle_timeout > 0 and now - watch.last_activity > self.idle_timeout:
+            return f"no data received for {self.idle_timeout:.0f} seconds"
+        if self.min_speed <= 0:
+            return None
+        watch.samples.append((now, watch.received))
+        while now - watch.samples[0][0] > self.window:
+            watch.samples.popleft()
+        oldest_time, oldest_received = watch.samples[0]
+        # Only judge transfers observed over (almost) the whole window
+        if now - oldest_time < self.window - 1:
+            return None
+        speed = (watch.received - oldest_received) / (now - oldest_time)
+        if speed < self.min_speed:
+            return f"{speed / 1024:.1f} KB/s over the last {self.window:.0f} seconds"
+        return None
+
+    def _count_stall(self, watch: TransferWatch) -> None:
+        with self._lock:
+            self.stalls += 1
+        logger.info(f"Aborting stalled transfer from {watch.link}: {watch.stalled}")
+
+
+def _is_read_timeout(error: BaseException) -> bool:
+    """Whether an error, or one it was raised from, is a read timeout."""
+    # requests wraps urllib3 errors in their arguments rather than chaining them
+    for _ in range(5):
+        if error is None:
+            return False
+        if isinstance(error, (requests.exceptions.ReadTimeout, urllib3.exceptions.ReadTimeoutError, socket.timeout)):
+            return True
+        error = error.__cause__ or error.__context__ or next((arg for arg in error.args if isinstance(arg, BaseException)), None)
+    return False